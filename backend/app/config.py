@@ -20,6 +20,7 @@ NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
 SCISPACY_MODEL = os.getenv("SCISPACY_MODEL", "en_core_sci_md")
+SCISPACY_USE_GPU = os.getenv("SCISPACY_USE_GPU", "false").lower() == "true"
 
 # Model name for BioClinicalBERT; if unavailable, adjust to a valid HF repo
 BIOCLINICALBERT_MODEL = os.getenv("BIOCLINICALBERT_MODEL", "microsoft/BiomedNLP-PubMedBERT-base-uncased-abstract-fulltext")
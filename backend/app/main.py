@@ -1,15 +1,17 @@
+import asyncio
 import os
+import json
 import base64
 from io import BytesIO
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional, Union
 from PIL import Image
 
 from app.config import (
     BIOCLINICALBERT_MODEL, CHUNK_TOKEN_TARGET, FAISS_INDEX_PATH,
-    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, SCISPACY_MODEL
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, SCISPACY_MODEL, SCISPACY_USE_GPU
 )
 from app.db import get_db
 from modules.data_ingestion.pdf_parser import extract_text_from_pdf_bytes
@@ -175,7 +177,7 @@ def get_entity_extractor():
         
     if _entity_extractor is None:
         try:
-            _entity_extractor = MedicalEntityExtractor(SCISPACY_MODEL)
+            _entity_extractor = MedicalEntityExtractor(SCISPACY_MODEL, use_gpu=SCISPACY_USE_GPU)
             print("✅ Medical entity extractor loaded")
         except Exception as e:
             print(f"⚠️  Entity extractor failed to load: {e}")
@@ -390,7 +392,7 @@ async def upload_pdf(file: UploadFile = File(...), title: str = Form(None)):
             
             print(f"💾 Adding to vector index...")
             faiss = get_faiss()
-            faiss.add(embeddings, chunks)
+            faiss.add(embeddings, chunks, persist=False)
             faiss.save(FAISS_INDEX_PATH)
             print(f"✅ Indexed successfully")
             
@@ -512,7 +514,8 @@ async def chat(
     
     # Generate answer with all enhancements
     gen = get_generator()
-    result = gen.generate_answer(
+    # Awaited so the LLM round-trip doesn't block the event loop for other requests
+    result = await gen.agenerate_answer(
         query, 
         valid_contexts, 
         level=level, 
@@ -540,6 +543,40 @@ async def chat(
     }
 
 
+@app.post("/chat/stream")
+async def chat_stream(
+    query: str = Form(...),
+    level: str = Form("Novice"),
+    use_surgical_cot: bool = Form(False)
+):
+    """
+    Streaming chat endpoint (Server-Sent Events) over vector retrieval.
+    
+    Emits one `data: {"delta": ...}` event per generated text fragment and a final
+    `data: [DONE]`. Answer verification needs the full text, so it is only
+    available from /chat.
+    """
+    faiss = get_faiss()
+    
+    if faiss.index.ntotal == 0:
+        contexts = []
+    else:
+        # The BERT forward pass and the search are blocking; keep them off the event loop
+        q_emb = (await asyncio.to_thread(get_embedder().embed_texts, [query]))[0]
+        contexts = await asyncio.to_thread(faiss.query, q_emb, top_k=5)
+    
+    async def events():
+        if not contexts:
+            yield f"data: {json.dumps({'delta': 'No relevant documents found. Please upload a PDF document first.'})}\n\n"
+        else:
+            gen = get_generator()
+            async for delta in gen.astream_answer(query, contexts, level=level, use_surgical_cot=use_surgical_cot):
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+        yield "data: [DONE]\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 @app.post("/quiz/start")
 async def quiz_start(query: str = Form(...), level: str = Form("Novice")):
     faiss = get_faiss()
@@ -8,6 +8,7 @@ without requiring full sciSpaCy installation.
 
 
 import sys
+import io
 import json
 from pathlib import Path
 from typing import Dict, List
@@ -33,6 +34,26 @@ from modules.generator.generator import Generator
 from modules.retriever.faiss_manager import FaissManager
 from modules.embedder.embedder import BioClinicalEmbedder
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def _json_default(obj):
+    """Convert NumPy scalars and arrays for the stdlib JSON encoder."""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def to_json_line(record: Dict) -> bytes:
+    """Serialize one result record as a JSONL line."""
+    if HAS_ORJSON:
+        return orjson.dumps(record, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) + b"\n"
+    return (json.dumps(record, ensure_ascii=False, default=_json_default) + "\n").encode('utf-8')
+
 
 def load_test_set(test_file: str = "test_data/validated_50plus_test_set.json") -> List[Dict]:
     """Load test QA pairs from JSON file."""
@@ -101,11 +122,20 @@ def initialize_system():
     }
 
 
-def generate_answer(query: str, faiss_manager, generator, embedder) -> str:
-    """Generate answer for a query using RAG."""
-    # Query FAISS using the query method
-    query_emb = embedder.embed_texts([query])[0]
-    results = faiss_manager.query(query_emb, top_k=5)
+def retrieve_contexts_batch(queries: List[str], faiss_manager, embedder, top_k: int = 5) -> List[List[Dict]]:
+    """Retrieve contexts for all queries with one embedding pass and one FAISS search."""
+    if not queries:
+        return []
+    query_embs = embedder.embed_texts(queries)
+    return faiss_manager.query_batch(query_embs, top_k=top_k)
+
+
+def generate_answer(query: str, faiss_manager, generator, embedder, results: List[Dict] = None) -> str:
+    """Generate answer for a query using RAG (pass precomputed FAISS results to skip retrieval)."""
+    if results is None:
+        # Query FAISS using the query method
+        query_emb = embedder.embed_texts([query])[0]
+        results = faiss_manager.query(query_emb, top_k=5)
     
     # Format contexts for generator (expects list of dicts with metadata)
     contexts = []
@@ -129,131 +159,149 @@ def generate_answer(query: str, faiss_manager, generator, embedder) -> str:
     return result.get('answer', '')
 
 
-def compute_verification_metrics(verification_results: List[Dict]) -> Dict:
-    """Compute aggregate verification metrics."""
-    if not verification_results:
+class VerificationMetricsAccumulator:
+    """Running totals behind compute_verification_metrics, fed one result at a time."""
+    
+    def __init__(self):
+        self.total = 0
+        self.verification_sum = 0.0
+        self.safety_sum = 0.0
+        self.certainty_sum = 0.0
+        self.abstentions = 0
+        self.total_hallucinations = 0
+        self.high_conf_count = 0
+        self.high_conf_verification_sum = 0.0
+        self.low_conf_count = 0
+        self.low_conf_verification_sum = 0.0
+    
+    def add(self, r: Dict):
+        """Add one verification result."""
+        self.total += 1
+        self.verification_sum += r['verification_score']
+        self.safety_sum += r.get('safety_score', 0)
+        self.certainty_sum += r.get('certainty', 0)
+        if r.get('abstention_decision', {}).get('should_abstain', False):
+            self.abstentions += 1
+        self.total_hallucinations += r.get('hallucination_analysis', {}).get('total_errors', 0)
+        if r['confidence_level'] == 'high':
+            self.high_conf_count += 1
+            self.high_conf_verification_sum += r['verification_score']
+        elif r['confidence_level'] == 'low':
+            self.low_conf_count += 1
+            self.low_conf_verification_sum += r['verification_score']
+    
+    def metrics(self) -> Dict:
+        """Aggregate metrics over every result added so far."""
+        if not self.total:
+            return {
+                'avg_verification_score': 0.0,
+                'avg_safety_score': 0.0,
+                'avg_certainty': 0.0,
+                'abstention_rate': 0.0,
+                'total_hallucinations': 0,
+                'high_confidence_count': 0,
+                'low_confidence_count': 0,
+                'high_confidence_verification': 0.0,
+                'low_confidence_verification': 0.0
+            }
+        
+        total = self.total
         return {
-            'avg_verification_score': 0.0,
-            'avg_safety_score': 0.0,
-            'avg_certainty': 0.0,
-            'abstention_rate': 0.0,
-            'total_hallucinations': 0,
-            'high_confidence_count': 0,
-            'low_confidence_count': 0,
-            'high_confidence_verification': 0.0,
-            'low_confidence_verification': 0.0
+            'avg_verification_score': self.verification_sum / total,
+            'avg_safety_score': self.safety_sum / total,
+            'avg_certainty': self.certainty_sum / total,
+            'abstention_rate': self.abstentions / total,
+            'abstention_count': f"{self.abstentions}/{total}",
+            'total_hallucinations': self.total_hallucinations,
+            'high_confidence_count': self.high_conf_count,
+            'low_confidence_count': self.low_conf_count,
+            'high_confidence_verification': (self.high_conf_verification_sum / self.high_conf_count
+                                             if self.high_conf_count else 0.0),
+            'low_confidence_verification': (self.low_conf_verification_sum / self.low_conf_count
+                                            if self.low_conf_count else 0.0)
         }
-    
-    total = len(verification_results)
-    
-    # Average scores
-    avg_verification = sum(r['verification_score'] for r in verification_results) / total
-    avg_safety = sum(r.get('safety_score', 0) for r in verification_results) / total
-    avg_certainty = sum(r.get('certainty', 0) for r in verification_results) / total
-    
-    # Abstention rate
-    abstentions = sum(1 for r in verification_results 
-                     if r.get('abstention_decision', {}).get('should_abstain', False))
-    abstention_rate = abstentions / total
-    
-    # Hallucinations
-    total_hallucinations = sum(
-        r.get('hallucination_analysis', {}).get('total_errors', 0)
-        for r in verification_results
-    )
-    
-    # Confidence levels
-    high_conf = [r for r in verification_results if r['confidence_level'] == 'high']
-    low_conf = [r for r in verification_results if r['confidence_level'] == 'low']
-    
-    high_conf_verification = (sum(r['verification_score'] for r in high_conf) / len(high_conf)
-                             if high_conf else 0.0)
-    low_conf_verification = (sum(r['verification_score'] for r in low_conf) / len(low_conf)
-                            if low_conf else 0.0)
-    
-    return {
-        'avg_verification_score': avg_verification,
-        'avg_safety_score': avg_safety,
-        'avg_certainty': avg_certainty,
-        'abstention_rate': abstention_rate,
-        'abstention_count': f"{abstentions}/{total}",
-        'total_hallucinations': total_hallucinations,
-        'high_confidence_count': len(high_conf),
-        'low_confidence_count': len(low_conf),
-        'high_confidence_verification': high_conf_verification,
-        'low_confidence_verification': low_conf_verification
-    }
 
 
-def generate_report_txt(test_results: List[Dict], metrics: Dict, output_file: str):
-    """Generate human-readable TXT report."""
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write("=" * 80 + "\n")
-        f.write("VERIFICATION METRICS REPORT FOR MICCAI SUBMISSION\n")
-        f.write("=" * 80 + "\n\n")
-        f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Test Set Size: {len(test_results)} QA pairs\n\n")
-        
-        # Overall Metrics
-        f.write("-" * 80 + "\n")
-        f.write("OVERALL METRICS\n")
-        f.write("-" * 80 + "\n")
-        f.write(f"Average Verification Score:    {metrics['avg_verification_score']*100:.2f}%\n")
-        f.write(f"Average Safety Score:          {metrics['avg_safety_score']*100:.2f}/100\n")
-        f.write(f"Average Certainty:             {metrics['avg_certainty']*100:.2f}%\n")
-        f.write(f"Abstention Rate:               {metrics['abstention_rate']*100:.2f}% ({metrics['abstention_count']})\n")
-        f.write(f"Total Hallucinations Detected: {metrics['total_hallucinations']}\n\n")
+def compute_verification_metrics(verification_results: List[Dict]) -> Dict:
+    """Compute aggregate verification metrics."""
+    accumulator = VerificationMetricsAccumulator()
+    for r in verification_results:
+        accumulator.add(r)
+    return accumulator.metrics()
+
+
+def generate_report_txt(sample_results: List[Dict], num_results: int, metrics: Dict, output_file: str):
+    """Generate human-readable TXT report (built in memory, written once) from the first results."""
+    f = io.StringIO()
+    f.write("=" * 80 + "\n")
+    f.write("VERIFICATION METRICS REPORT FOR MICCAI SUBMISSION\n")
+    f.write("=" * 80 + "\n\n")
+    f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+    f.write(f"Test Set Size: {num_results} QA pairs\n\n")
+    
+    # Overall Metrics
+    f.write("-" * 80 + "\n")
+    f.write("OVERALL METRICS\n")
+    f.write("-" * 80 + "\n")
+    f.write(f"Average Verification Score:    {metrics['avg_verification_score']*100:.2f}%\n")
+    f.write(f"Average Safety Score:          {metrics['avg_safety_score']*100:.2f}/100\n")
+    f.write(f"Average Certainty:             {metrics['avg_certainty']*100:.2f}%\n")
+    f.write(f"Abstention Rate:               {metrics['abstention_rate']*100:.2f}% ({metrics['abstention_count']})\n")
+    f.write(f"Total Hallucinations Detected: {metrics['total_hallucinations']}\n\n")
+    
+    # Confidence Distribution
+    f.write("-" * 80 + "\n")
+    f.write("CONFIDENCE DISTRIBUTION\n")
+    f.write("-" * 80 + "\n")
+    f.write(f"High Confidence Answers:       {metrics['high_confidence_count']} "
+            f"({metrics['high_confidence_count']/num_results*100:.1f}%)\n")
+    f.write(f"  - Avg Verification:          {metrics['high_confidence_verification']*100:.2f}%\n")
+    f.write(f"Low Confidence Answers:        {metrics['low_confidence_count']} "
+            f"({metrics['low_confidence_count']/num_results*100:.1f}%)\n")
+    f.write(f"  - Avg Verification:          {metrics['low_confidence_verification']*100:.2f}%\n\n")
+    
+    # Sample Answers
+    f.write("-" * 80 + "\n")
+    f.write("SAMPLE VERIFICATION RESULTS (First 5 examples)\n")
+    f.write("-" * 80 + "\n\n")
+    
+    for i, result in enumerate(sample_results[:5], 1):
+        f.write(f"\n[EXAMPLE {i}]\n")
+        f.write(f"Question: {result['question'][:150]}...\n\n")
+        f.write(f"Generated Answer: {result['generated_answer'][:200]}...\n\n")
+        f.write(f"Verification Score:    {result['verification']['verification_score']*100:.2f}%\n")
+        f.write(f"Confidence Level:      {result['verification']['confidence_level'].upper()}\n")
+        f.write(f"Safety Score:          {result['verification'].get('safety_score', 0)*100:.0f}/100\n")
         
-        # Confidence Distribution
-        f.write("-" * 80 + "\n")
-        f.write("CONFIDENCE DISTRIBUTION\n")
-        f.write("-" * 80 + "\n")
-        f.write(f"High Confidence Answers:       {metrics['high_confidence_count']} "
-                f"({metrics['high_confidence_count']/len(test_results)*100:.1f}%)\n")
-        f.write(f"  - Avg Verification:          {metrics['high_confidence_verification']*100:.2f}%\n")
-        f.write(f"Low Confidence Answers:        {metrics['low_confidence_count']} "
-                f"({metrics['low_confidence_count']/len(test_results)*100:.1f}%)\n")
-        f.write(f"  - Avg Verification:          {metrics['low_confidence_verification']*100:.2f}%\n\n")
+        abstention = result['verification'].get('abstention_decision', {})
+        should_abstain = abstention.get('should_abstain', False)
+        f.write(f"Abstention:            {'YES' if should_abstain else 'NO'}\n")
         
-        # Sample Answers
-        f.write("-" * 80 + "\n")
-        f.write("SAMPLE VERIFICATION RESULTS (First 5 examples)\n")
-        f.write("-" * 80 + "\n\n")
+        if should_abstain:
+            f.write(f"  Reason: {abstention.get('reason', 'N/A')}\n")
+            f.write(f"  Strategy: {abstention.get('strategy', 'N/A')}\n")
         
-        for i, result in enumerate(test_results[:5], 1):
-            f.write(f"\n[EXAMPLE {i}]\n")
-            f.write(f"Question: {result['question'][:150]}...\n\n")
-            f.write(f"Generated Answer: {result['generated_answer'][:200]}...\n\n")
-            f.write(f"Verification Score:    {result['verification']['verification_score']*100:.2f}%\n")
-            f.write(f"Confidence Level:      {result['verification']['confidence_level'].upper()}\n")
-            f.write(f"Safety Score:          {result['verification'].get('safety_score', 0)*100:.0f}/100\n")
-            
-            abstention = result['verification'].get('abstention_decision', {})
-            should_abstain = abstention.get('should_abstain', False)
-            f.write(f"Abstention:            {'YES' if should_abstain else 'NO'}\n")
-            
-            if should_abstain:
-                f.write(f"  Reason: {abstention.get('reason', 'N/A')}\n")
-                f.write(f"  Strategy: {abstention.get('strategy', 'N/A')}\n")
-            
-            hallucinations = result['verification'].get('hallucination_analysis', {})
-            f.write(f"Hallucinations:        {hallucinations.get('total_errors', 0)} detected\n")
-            
-            f.write("\n" + "-" * 80 + "\n")
+        hallucinations = result['verification'].get('hallucination_analysis', {})
+        f.write(f"Hallucinations:        {hallucinations.get('total_errors', 0)} detected\n")
         
-        f.write("\n[OK] Report complete\n")
+        f.write("\n" + "-" * 80 + "\n")
+    
+    f.write("\n[OK] Report complete\n")
+    
+    with open(output_file, 'w', encoding='utf-8') as out:
+        out.write(f.getvalue())
 
 
-def generate_report_json(test_results: List[Dict], metrics: Dict, output_file: str):
-    """Generate JSON report."""
+def generate_report_json(num_results: int, metrics: Dict, output_file: str, results_file: str):
+    """Generate JSON report (per-query results live in the JSONL file streamed during the run)."""
     report = {
         'metadata': {
             'generated_at': datetime.now().isoformat(),
-            'test_set_size': len(test_results),
-            'script_version': '2.0'
+            'test_set_size': num_results,
+            'script_version': '2.1'
         },
         'metrics': metrics,
-        'results': test_results
+        'results_file': Path(results_file).name
     }
     
     with open(output_file, 'w', encoding='utf-8') as f:
@@ -299,51 +347,79 @@ def main():
     # Initialize system
     components = initialize_system()
     
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_dir = Path(__file__).parent / "results"
+    output_dir.mkdir(exist_ok=True)
+    
+    txt_file = output_dir / f"verification_report_{timestamp}.txt"
+    json_file = output_dir / f"verification_report_{timestamp}.json"
+    results_file = output_dir / f"verification_results_{timestamp}.jsonl"
+    latex_file = output_dir / f"verification_table_{timestamp}.tex"
+    
     # Run verification on all test pairs
     print("\n[OK] Running verification on test set...")
     print("-" * 80)
     
-    test_results = []
+    # Embed and search every question up front; the loop below only generates and verifies
+    retrieved = retrieve_contexts_batch(
+        [qa_pair['question'] for qa_pair in test_qa_pairs],
+        components['faiss'],
+        components['embedder'],
+        top_k=5
+    )
     
-    for i, qa_pair in enumerate(test_qa_pairs, 1):
-        question = qa_pair['question']
-        expected_answer = qa_pair.get('answer', '')
-        
-        print(f"\n[{i}/{len(test_qa_pairs)}] Processing: {question[:80]}...")
-        
-        # Generate answer
-        generated_answer = generate_answer(
-            question, 
-            components['faiss'], 
-            components['generator'],
-            components['embedder']
-        )
-        
-        # Verify answer
-        verification_result = components['verifier'].verify_answer(question, generated_answer)
-        
-        # Extract key metrics
-        verification_score = verification_result['verification_score']
-        confidence = verification_result['confidence_level']
-        should_abstain = verification_result.get('abstention_decision', {}).get('should_abstain', False)
-        
-        print(f"  Verification: {verification_score*100:.2f}% | Confidence: {confidence.upper()} | "
-              f"Abstention: {'YES' if should_abstain else 'NO'}")
-        
-        # Store results
-        test_results.append({
-            'question': question,
-            'expected_answer': expected_answer,
-            'generated_answer': generated_answer,
-            'verification': verification_result
-        })
+    # Each result is appended to the JSONL file as soon as it is verified,
+    # so an interrupted run keeps everything completed so far
+    accumulator = VerificationMetricsAccumulator()
+    sample_results = []
+    with open(results_file, 'wb') as results_stream:
+        for i, (qa_pair, results) in enumerate(zip(test_qa_pairs, retrieved), 1):
+            question = qa_pair['question']
+            expected_answer = qa_pair.get('answer', '')
+            
+            print(f"\n[{i}/{len(test_qa_pairs)}] Processing: {question[:80]}...")
+            
+            # Generate answer
+            generated_answer = generate_answer(
+                question, 
+                components['faiss'], 
+                components['generator'],
+                components['embedder'],
+                results=results
+            )
+            
+            # Verify answer
+            verification_result = components['verifier'].verify_answer(question, generated_answer)
+            
+            # Extract key metrics
+            verification_score = verification_result['verification_score']
+            confidence = verification_result['confidence_level']
+            should_abstain = verification_result.get('abstention_decision', {}).get('should_abstain', False)
+            
+            print(f"  Verification: {verification_score*100:.2f}% | Confidence: {confidence.upper()} | "
+                  f"Abstention: {'YES' if should_abstain else 'NO'}")
+            
+            # Store results
+            record = {
+                'question': question,
+                'expected_answer': expected_answer,
+                'generated_answer': generated_answer,
+                'verification': verification_result
+            }
+            results_stream.write(to_json_line(record))
+            results_stream.flush()
+            
+            # Only the running totals and the report's sample records stay in memory
+            accumulator.add(verification_result)
+            if len(sample_results) < 5:
+                sample_results.append(record)
     
     print("\n" + "-" * 80)
     print("[OK] Verification complete\n")
     
-    # Compute aggregate metrics
+    # Aggregate metrics were accumulated while streaming
     print("[OK] Computing aggregate metrics...")
-    metrics = compute_verification_metrics([r['verification'] for r in test_results])
+    metrics = accumulator.metrics()
     
     # Print summary
     print("\n" + "=" * 80)
@@ -358,19 +434,12 @@ def main():
     print("=" * 80 + "\n")
     
     # Generate reports
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_dir = Path(__file__).parent / "results"
-    output_dir.mkdir(exist_ok=True)
-    
-    txt_file = output_dir / f"verification_report_{timestamp}.txt"
-    json_file = output_dir / f"verification_report_{timestamp}.json"
-    latex_file = output_dir / f"verification_table_{timestamp}.tex"
-    
     print("[OK] Generating reports...")
-    generate_report_txt(test_results, metrics, str(txt_file))
+    print(f"[OK] Per-query results: {results_file}")
+    generate_report_txt(sample_results, accumulator.total, metrics, str(txt_file))
     print(f"[OK] TXT report: {txt_file}")
     
-    generate_report_json(test_results, metrics, str(json_file))
+    generate_report_json(accumulator.total, metrics, str(json_file), str(results_file))
     print(f"[OK] JSON report: {json_file}")
     
     generate_latex_table(metrics, str(latex_file))
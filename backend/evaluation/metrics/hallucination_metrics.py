@@ -89,17 +89,22 @@ class HallucinationDetector:
                 'coverage_ratio': 0.0
             }
         
+        # Tokenize each chunk once instead of once per claim
+        chunk_token_sets = [frozenset(chunk.lower().split()) for chunk in context_chunks]
+
         supported = 0
         for claim in claims:
-            claim_tokens = set(claim.lower().split())
-            
+            claim_tokens = frozenset(claim.lower().split())
+            if not claim_tokens:
+                continue
+            inv_claim_len = 1.0 / len(claim_tokens)
+
             # Check if majority of claim tokens appear in any context chunk
-            for chunk in context_chunks:
-                chunk_tokens = set(chunk.lower().split())
-                overlap = len(claim_tokens & chunk_tokens)
-                
+            for chunk_tokens in chunk_token_sets:
+                overlap = sum(1 for token in claim_tokens if token in chunk_tokens)
+
                 # If >70% of claim tokens in chunk, consider supported
-                if overlap / len(claim_tokens) > 0.7:
+                if overlap * inv_claim_len > 0.7:
                     supported += 1
                     break
         
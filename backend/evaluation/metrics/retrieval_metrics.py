@@ -5,7 +5,6 @@ Implements standard IR metrics: Recall@K, MRR, NDCG, MAP
 
 import numpy as np
 from typing import List, Dict, Tuple
-from collections import defaultdict
 
 
 class RetrievalMetrics:
@@ -145,10 +144,17 @@ def evaluate_retrieval(
     Returns:
         Dict of metric names to average scores
     """
+    if not queries:
+        return {}
+    
     metrics = RetrievalMetrics()
-    results = defaultdict(list)
     
-    for query_data in queries:
+    # One preallocated score array per metric, filled by query index
+    metric_names = [f'{name}@{k}' for k in k_values for name in ('Recall', 'Precision', 'NDCG')]
+    metric_names += ['MRR', 'MAP']
+    results = {name: np.zeros(len(queries), dtype=np.float64) for name in metric_names}
+    
+    for i, query_data in enumerate(queries):
         query = query_data['query']
         relevant_ids = query_data['relevant_doc_ids']
         
@@ -157,22 +163,12 @@ def evaluate_retrieval(
         
         # Calculate metrics
         for k in k_values:
-            results[f'Recall@{k}'].append(
-                metrics.recall_at_k(retrieved_ids, relevant_ids, k)
-            )
-            results[f'Precision@{k}'].append(
-                metrics.precision_at_k(retrieved_ids, relevant_ids, k)
-            )
-            results[f'NDCG@{k}'].append(
-                metrics.ndcg_at_k(retrieved_ids, relevant_ids, k)
-            )
-        
-        results['MRR'].append(
-            metrics.mean_reciprocal_rank(retrieved_ids, relevant_ids)
-        )
-        results['MAP'].append(
-            metrics.average_precision(retrieved_ids, relevant_ids)
-        )
+            results[f'Recall@{k}'][i] = metrics.recall_at_k(retrieved_ids, relevant_ids, k)
+            results[f'Precision@{k}'][i] = metrics.precision_at_k(retrieved_ids, relevant_ids, k)
+            results[f'NDCG@{k}'][i] = metrics.ndcg_at_k(retrieved_ids, relevant_ids, k)
+        
+        results['MRR'][i] = metrics.mean_reciprocal_rank(retrieved_ids, relevant_ids)
+        results['MAP'][i] = metrics.average_precision(retrieved_ids, relevant_ids)
     
     # Average across all queries
     avg_results = {
@@ -6,13 +6,17 @@ NOTE: This is a template. You need to integrate with your actual RAG system.
 """
 
 import asyncio
+import hashlib
 import json
 import os
 import sys
+from collections import Counter
 from typing import Dict, List, Optional
 from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
+import numpy as np
+from tqdm import tqdm
 
 # Load environment variables from .env file
 env_path = Path(__file__).parent.parent / '.env'
@@ -21,10 +25,16 @@ load_dotenv(env_path)
 # Add parent directory to import backend modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+# Idle OpenMP workers sleep instead of spinning between batched FAISS searches.
+# Must be set before faiss/torch load the OpenMP runtime.
+os.environ.setdefault('OMP_WAIT_POLICY', 'PASSIVE')
+
 # Import actual RAG components
 try:
+    import faiss
     from modules.embedder.embedder import BioClinicalEmbedder
     from modules.retriever.faiss_manager import FaissManager
+    from modules.retriever.approximate_index import load_approximate_index, recall_vs_flat, tune_search_params
     from modules.generator.generator import Generator
     RAG_IMPORTS_AVAILABLE = True
 except ImportError as e:
@@ -48,6 +58,12 @@ except ImportError:
     VERIFICATION_AVAILABLE = False
     print("[WARNING] Verification pipeline unavailable")
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 try:
     import pandas as pd
     import matplotlib.pyplot as plt
@@ -57,13 +73,34 @@ except ImportError:
     HAS_VISUALIZATION = False
     print("Warning: pandas/matplotlib not installed. Visualizations will be skipped.")
 
-from metrics.retrieval_metrics import evaluate_retrieval, RetrievalMetrics
+from metrics.retrieval_metrics import (
+    evaluate_retrieval, RetrievalMetrics
+)
 from metrics.qa_metrics import evaluate_qa, QAMetrics
 from metrics.hallucination_metrics import evaluate_hallucination
 from ablation_study import AblationStudy
 from test_data.dataset_generator import QADatasetGenerator
 
 
+def load_json(path) -> Dict:
+    """Read a JSON file, using orjson when available"""
+    if HAS_ORJSON:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def dump_json(obj, path):
+    """Write indented JSON, using orjson (with native NumPy support) when available"""
+    if HAS_ORJSON:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS))
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, indent=2)
+
+
 class ComprehensiveEvaluator:
     """Run complete evaluation suite for publication"""
     
@@ -84,8 +121,7 @@ class ComprehensiveEvaluator:
         
         # Load configuration
         if Path(config_file).exists():
-            with open(config_file, 'r') as f:
-                self.config = json.load(f)
+            self.config = load_json(config_file)
         else:
             print(f"Warning: Config file {config_file} not found. Using defaults.")
             self.config = self._get_default_config()
@@ -108,6 +144,13 @@ class ComprehensiveEvaluator:
         self.generator = None
         self.graph_retriever = None
         self.verification_pipeline = None  # NEW: Verification pipeline
+        self.query_embeddings: Dict[str, np.ndarray] = {}  # question -> cached embedding
+        self.query_contexts: Dict[str, List[Dict]] = {}  # question -> batched FAISS results
+        self.query_contexts_depth = 10
+        self.query_max_length = self.config.get('query_max_length', 128)  # token limit for question embeddings
+        self.query_ids: Dict[str, np.ndarray] = {}  # question -> FAISS ids from the batch search
+        self.chunk_texts: Optional[np.ndarray] = None  # FAISS id -> chunk text (object array)
+        self.chunk_ids: Optional[np.ndarray] = None  # FAISS id -> metadata chunk id as str, None if missing (object array)
         if RAG_IMPORTS_AVAILABLE:
             self._init_rag_components()
     
@@ -131,7 +174,11 @@ class ComprehensiveEvaluator:
         try:
             # Initialize embedder
             model_name = self.config.get('bioclinicalbert_model', 'emilyalsentzer/Bio_ClinicalBERT')
-            self.embedder = BioClinicalEmbedder(model_name)
+            self.embedder = BioClinicalEmbedder(
+                model_name,
+                dtype=self.config.get('embedder_dtype'),  # None = float32; "bfloat16" to opt in
+                device=self.config.get('embedder_device')
+            )
             print(f"Initialized BioClinicalBERT embedder (dim={self.embedder.dim()})")
             
             # Initialize FAISS
@@ -143,6 +190,38 @@ class ComprehensiveEvaluator:
             except:
                 print("No existing FAISS index found or empty index")
             
+            self._build_chunk_text_cache()
+            
+            # A prebuilt HNSW, IVF+PQ or SQ8 companion index (see modules/retriever/approximate_index.py)
+            # changes the reported numbers, so it is only used when the config asks for it
+            approx_index = None
+            if self.config.get('use_approximate_index', False):
+                approx_index = load_approximate_index(
+                    faiss_path,
+                    nprobe=self.config.get('faiss_nprobe'),
+                    ef_search=self.config.get('faiss_ef_search')
+                )
+            if approx_index is not None and approx_index.ntotal == self.faiss.index.ntotal:
+                index_type = type(approx_index).__name__
+                self.results['approximate_index'] = {'type': index_type}
+                # Without explicit knobs, sweep nprobe/efSearch for the cheapest setting that hits the target recall
+                if self.config.get('faiss_nprobe') is None and self.config.get('faiss_ef_search') is None:
+                    tuned = tune_search_params(
+                        self.faiss.index, approx_index,
+                        target_recall=self.config.get('faiss_target_recall', 0.95)
+                    )
+                    if tuned:
+                        self.results['approximate_index']['tuning'] = tuned
+                        print(f"Tuned {tuned['param']}={tuned['value']} (recall@10 {tuned['recall']:.4f})")
+                recall = recall_vs_flat(self.faiss.index, approx_index)
+                self.results['approximate_index']['recall@10_vs_flat'] = recall
+                self.faiss.index = approx_index
+                print(f"Using {index_type} index (recall@10 vs flat on sample: {recall:.4f})")
+            
+            # Batched searches parallelize over queries; cap threads so FAISS doesn't hog every core
+            faiss_threads = self.config.get('faiss_threads') or min(os.cpu_count() or 1, 16)
+            faiss.omp_set_num_threads(faiss_threads)
+            
             # Initialize generator
             api_key = self.config.get('api_key') or os.getenv('OPENAI_API_KEY') or os.getenv('OPENROUTER_API_KEY')
             self.generator = Generator(openai_api_key=api_key)
@@ -158,7 +237,10 @@ class ComprehensiveEvaluator:
                         neo4j_config.get('password', 'password')
                     )
                     scispacy_model = self.config.get('scispacy_model', 'en_core_sci_md')
-                    entity_extractor = MedicalEntityExtractor(scispacy_model)
+                    entity_extractor = MedicalEntityExtractor(
+                        scispacy_model,
+                        use_gpu=self.config.get('scispacy_use_gpu', False)
+                    )
                     self.graph_retriever = GraphEnhancedRetriever(
                         self.faiss,
                         neo4j,
@@ -197,6 +279,7 @@ class ComprehensiveEvaluator:
         # 1. Load or generate test dataset
         print("\n[1/7] Loading test dataset...")
         test_data = await self._load_test_dataset()
+        self._precompute_query_embeddings(test_data)
         
         # 2. Evaluate retrieval performance
         print("\n[2/7] Evaluating retrieval performance...")
@@ -204,11 +287,11 @@ class ComprehensiveEvaluator:
         
         # 3. Evaluate QA performance
         print("\n[3/7] Evaluating QA performance...")
-        self.results['qa_results'] = self._evaluate_qa(test_data)
+        self.results['qa_results'] = await self._evaluate_qa(test_data)
         
         # 4. Evaluate hallucination/faithfulness
         print("\n[4/7] Evaluating hallucination rates...")
-        self.results['hallucination_results'] = self._evaluate_hallucination(test_data)
+        self.results['hallucination_results'] = await self._evaluate_hallucination(test_data)
         
         # 5. Evaluate verification pipeline (NEW)
         print("\n[5/7] Evaluating verification pipeline...")
@@ -238,9 +321,8 @@ class ComprehensiveEvaluator:
         
         if dataset_path.exists():
             print(f"Loading existing test dataset: {dataset_path}")
-            with open(dataset_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                dataset = data.get('qa_pairs', [])
+            data = load_json(dataset_path)
+            dataset = data.get('qa_pairs', [])
         else:
             print("Test dataset not found. Generating new dataset...")
             
@@ -250,7 +332,8 @@ class ComprehensiveEvaluator:
             # Generate QA pairs
             generator = QADatasetGenerator(
                 api_key=self.config['api_key'],
-                output_dir=str(self.output_dir / "test_data")
+                output_dir=str(self.output_dir / "test_data"),
+                max_concurrent_requests=self.config.get('max_concurrent_requests', 8)
             )
             
             qa_pairs = await generator.generate_dataset_from_documents(
@@ -269,10 +352,12 @@ class ComprehensiveEvaluator:
         
         # Calculate dataset statistics
         if len(dataset) > 0:
+            question_lengths = np.fromiter((len(qa['question']) for qa in dataset), dtype=np.int32, count=len(dataset))
+            answer_lengths = np.fromiter((len(qa['answer']) for qa in dataset), dtype=np.int32, count=len(dataset))
             self.results['dataset_stats'] = {
                 'num_examples': len(dataset),
-                'avg_question_length': sum(len(qa['question']) for qa in dataset) / len(dataset),
-                'avg_answer_length': sum(len(qa['answer']) for qa in dataset) / len(dataset),
+                'avg_question_length': float(question_lengths.mean()),
+                'avg_answer_length': float(answer_lengths.mean()),
                 'num_unique_chunks': len(set(qa['chunk_id'] for qa in dataset))
             }
         else:
@@ -282,6 +367,81 @@ class ComprehensiveEvaluator:
         print(f"Dataset loaded: {len(dataset)} examples")
         return dataset
     
+    def _precompute_query_embeddings(self, test_data: List[Dict]):
+        """
+        Embed all test questions in one batched call and cache them on disk.
+        
+        The cache file name includes a hash of the model name, dtype and question
+        list, so editing the test set or the precision invalidates it automatically.
+        """
+        if not self.embedder or not test_data:
+            return
+        
+        questions = [qa['question'] for qa in test_data]
+        digest = hashlib.sha1(
+            "\n".join(
+                [self.embedder.model_name, str(self.embedder.dtype), str(self.query_max_length)] + questions
+            ).encode('utf-8')
+        ).hexdigest()[:16]
+        cache_path = self.output_dir / f".query_embeddings_{digest}.npy"
+        
+        if cache_path.exists():
+            embeddings = np.load(cache_path)
+            print(f"Loaded cached query embeddings: {cache_path}")
+        else:
+            embeddings = np.empty((len(questions), self.embedder.dim()), dtype=np.float32)
+            self.embedder.embed_texts(questions, out=embeddings, max_length=self.query_max_length)
+            np.save(cache_path, embeddings)
+            print(f"Cached {len(questions)} query embeddings: {cache_path}")
+        
+        self.query_embeddings = dict(zip(questions, embeddings))
+        
+        # Vector-only retrieval does not depend on the pass, so search every question
+        # once as a single normalized (n, dim) batch and reuse the results
+        if self.faiss and not self.graph_retriever:
+            # Normalized in place: the cached rows stay valid query vectors
+            D, I = self.faiss.search(embeddings, top_k=self.query_contexts_depth, copy=False)
+            self.query_contexts = dict(zip(questions, self.faiss.to_results(D, I)))
+            self.query_ids = dict(zip(questions, I))
+    
+    def _embed_query(self, question: str):
+        """Return the cached embedding for a question, embedding it on a cache miss"""
+        query_emb = self.query_embeddings.get(question)
+        if query_emb is None:
+            query_emb = self.embedder.embed_texts([question], max_length=self.query_max_length)[0]
+        return query_emb
+    
+    def _build_chunk_text_cache(self):
+        """Flatten FAISS metadata into id-indexed arrays of chunk texts and chunk ids (read once at init)"""
+        ntotal = self.faiss.index.ntotal
+        self.chunk_texts = np.full(ntotal, '', dtype=object)
+        self.chunk_ids = np.full(ntotal, None, dtype=object)
+        for idx, meta in self.faiss.id_to_meta.items():
+            if 0 <= idx < ntotal:
+                self.chunk_texts[idx] = meta.get('text', '')
+                chunk_id = meta.get('chunk_id') or meta.get('chunk_index') or meta.get('id', None)
+                if chunk_id is not None:
+                    self.chunk_ids[idx] = str(chunk_id)
+    
+    def _context_texts(self, question: str, contexts: List[Dict]) -> List[str]:
+        """Non-empty texts of the retrieved contexts, via the id-indexed cache when possible"""
+        ids = self.query_ids.get(question)
+        if ids is not None and self.chunk_texts is not None and not self.graph_retriever:
+            texts = self.chunk_texts[ids[ids >= 0][:len(contexts)]]
+        else:
+            texts = [c.get('metadata', {}).get('text', '') or c.get('text', '') for c in contexts]
+        return [t for t in texts if t]  # Filter empty strings
+    
+    def _retrieve_contexts(self, question: str, top_k: int) -> List[Dict]:
+        """Retrieve contexts with the graph retriever if available, otherwise FAISS"""
+        if self.graph_retriever:
+            return self.graph_retriever.retrieve(question, top_k=top_k, use_graph=True)
+        
+        contexts = self.query_contexts.get(question)
+        if contexts is not None and top_k <= self.query_contexts_depth:
+            return contexts[:top_k]
+        return self.faiss.query(self._embed_query(question), top_k=top_k)
+    
     def _load_documents(self) -> List[Dict]:
         """Load document corpus"""
         # Placeholder - load from your actual document storage
@@ -289,27 +449,31 @@ class ComprehensiveEvaluator:
     
     def _evaluate_retrieval(self, test_data: List[Dict]) -> Dict:
         """Evaluate retrieval metrics"""
+        # Only examples with a ground-truth chunk can be scored; filter once up front
+        labeled = [qa for qa in test_data if qa.get('chunk_id') is not None]
+        if len(labeled) < len(test_data):
+            print(f"Skipping {len(test_data) - len(labeled)} examples without a chunk_id")
+        
         # Convert test data to retrieval format
         queries = [
             {
                 'query': qa['question'],
                 'relevant_doc_ids': [str(qa['chunk_id'])]  # Convert to string to match retrieved IDs
             }
-            for qa in test_data
+            for qa in labeled
         ]
         
+        k_values = self.config['evaluation']['k_values']
+        top_k = 10
+        errors = []
+        
         # Your retrieval function using actual RAG system
         def retrieve_function(query):
             if not self.faiss or not self.embedder:
                 return []  # Placeholder mode
             
             try:
-                # Use graph retriever if available, otherwise FAISS
-                if self.graph_retriever:
-                    contexts = self.graph_retriever.retrieve(query, top_k=10, use_graph=True)
-                else:
-                    query_emb = self.embedder.embed_texts([query])[0]
-                    contexts = self.faiss.query(query_emb, top_k=10)
+                contexts = self._retrieve_contexts(query, top_k=top_k)
                 
                 # Extract chunk IDs from metadata
                 chunk_ids = []
@@ -324,26 +488,40 @@ class ComprehensiveEvaluator:
                 
                 return chunk_ids
             except Exception as e:
-                print(f"Retrieval error: {e}")
+                errors.append(str(e))
                 return []
         
+        # Every question was already searched as one batch: map the FAISS id rows to the
+        # same chunk id lists through the id-indexed cache instead of walking the metadata
+        if (self.faiss and self.embedder and self.chunk_ids is not None and not self.graph_retriever
+                and top_k <= self.query_contexts_depth
+                and all(q['query'] in self.query_ids for q in queries)):
+            retrieved = {}
+            for q in queries:
+                ids = self.query_ids[q['query']]
+                retrieved[q['query']] = [
+                    chunk_id for chunk_id in self.chunk_ids[ids[ids >= 0][:top_k]] if chunk_id is not None
+                ]
+            retrieve_function = retrieved.__getitem__
+        
         # Evaluate
         results = evaluate_retrieval(
-            queries,
+            tqdm(queries, desc="Retrieval"),
             retrieve_function,
-            k_values=self.config['evaluation']['k_values']
+            k_values=k_values
         )
         
+        if errors:
+            print(f"  {len(errors)} retrieval errors (first: {errors[0]})")
+        
         return results
     
-    def _evaluate_qa(self, test_data: List[Dict]) -> Dict:
+    async def _evaluate_qa(self, test_data: List[Dict]) -> Dict:
         """Evaluate QA metrics"""
-        # Generate predictions from your system
+        # Generate predictions from your system (LLM calls run concurrently)
+        generated = await self._generate_answers_concurrently(test_data)
         predictions = []
-        for qa in test_data:
-            # TODO: Generate prediction using your RAG system
-            prediction = self._generate_answer(qa['question'])
-            
+        for qa, (prediction, _) in zip(test_data, generated):
             predictions.append({
                 'prediction': prediction,
                 'reference': qa['answer']
@@ -354,13 +532,11 @@ class ComprehensiveEvaluator:
         
         return results
     
-    def _evaluate_hallucination(self, test_data: List[Dict]) -> Dict:
+    async def _evaluate_hallucination(self, test_data: List[Dict]) -> Dict:
         """Evaluate hallucination rates"""
+        generated = await self._generate_answers_concurrently(test_data)
         predictions = []
-        for qa in test_data:
-            # TODO: Generate answer with retrieved context
-            answer, context_chunks = self._generate_answer_with_context(qa['question'])
-            
+        for answer, context_chunks in generated:
             predictions.append({
                 'answer': answer,
                 'context_chunks': context_chunks
@@ -391,14 +567,14 @@ class ComprehensiveEvaluator:
         
         verification_reports = []
         abstention_count = 0
-        hallucination_counts = {}
+        hallucination_counts = Counter()
         severity_counts = {'critical': 0, 'high': 0, 'medium': 0, 'low': 0}
         safety_scores = []
         uncertainties = []
         
-        print(f"Running verification on {len(test_data)} test examples...")
+        errors = []
         
-        for i, qa in enumerate(test_data):
+        for i, qa in enumerate(tqdm(test_data, desc="Verification")):
             try:
                 # Generate answer
                 answer, context_chunks = self._generate_answer_with_context(qa['question'])
@@ -413,11 +589,9 @@ class ComprehensiveEvaluator:
                 
                 # Collect hallucination statistics
                 hall_analysis = report.get('hallucination_analysis', {})
-                for hallucination in hall_analysis.get('hallucinations', []):
-                    h_type = hallucination.get('type', 'unknown')
-                    hallucination_counts[h_type] = hallucination_counts.get(h_type, 0) + 1
-                    
-                    severity = hallucination.get('severity', 'unknown')
+                hallucinations = hall_analysis.get('hallucinations', [])
+                hallucination_counts.update(h.get('type', 'unknown') for h in hallucinations)
+                for severity in (h.get('severity', 'unknown') for h in hallucinations):
                     if severity in severity_counts:
                         severity_counts[severity] += 1
                 
@@ -428,14 +602,14 @@ class ComprehensiveEvaluator:
                 # Collect uncertainty
                 uncertainty = report.get('uncertainty_analysis', {}).get('overall_uncertainty', 0.0)
                 uncertainties.append(uncertainty)
-                
-                if (i + 1) % 5 == 0:
-                    print(f"  Processed {i + 1}/{len(test_data)} examples...")
                     
             except Exception as e:
-                print(f"  Error verifying question {i+1}: {e}")
+                errors.append((i + 1, str(e)))
                 continue
         
+        if errors:
+            print(f"  {len(errors)} verification errors (first: question {errors[0][0]}: {errors[0][1]})")
+        
         # Compile results
         abstention_rate = abstention_count / len(test_data) if test_data else 0.0
         avg_safety_score = sum(safety_scores) / len(safety_scores) if safety_scores else 0.0
@@ -445,7 +619,7 @@ class ComprehensiveEvaluator:
             'abstention_rate': abstention_rate,
             'abstention_count': abstention_count,
             'total_examples': len(test_data),
-            'hallucination_distribution': hallucination_counts,
+            'hallucination_distribution': dict(hallucination_counts),
             'severity_distribution': severity_counts,
             'avg_safety_score': avg_safety_score,
             'avg_uncertainty': avg_uncertainty,
@@ -502,36 +676,12 @@ class ComprehensiveEvaluator:
             'Dense Retrieval': {'recall@5': 0.0}
         }
     
-    def _generate_answer(self, question: str) -> str:
-        """Generate answer using your RAG system"""
-        try:
-            # Use graph retriever if available, otherwise FAISS
-            if self.graph_retriever:
-                contexts = self.graph_retriever.retrieve(question, top_k=5, use_graph=True)
-            else:
-                query_emb = self.embedder.embed_texts([question])[0]
-                contexts = self.faiss.query(query_emb, top_k=5)
-            
-            # Generate answer using retrieved contexts
-            answer = self.generator.generate_answer(question, contexts, level="Advanced")
-            return answer
-        except Exception as e:
-            print(f"[WARNING] Error generating answer: {e}")
-            return f"Error: {str(e)}"
-    
     def _generate_answer_with_context(self, question: str) -> tuple:
         """Generate answer with retrieved context"""
         try:
-            # Use graph retriever if available, otherwise FAISS
-            if self.graph_retriever:
-                contexts = self.graph_retriever.retrieve(question, top_k=5, use_graph=True)
-            else:
-                query_emb = self.embedder.embed_texts([question])[0]
-                contexts = self.faiss.query(query_emb, top_k=5)
+            contexts = self._retrieve_contexts(question, top_k=5)
             
-            # Extract text from context chunks
-            context_texts = [c.get('metadata', {}).get('text', '') or c.get('text', '') for c in contexts]
-            context_texts = [t for t in context_texts if t]  # Filter empty strings
+            context_texts = self._context_texts(question, contexts)
             
             # Generate answer
             answer = self.generator.generate_answer(question, contexts, level="Advanced")
@@ -540,90 +690,110 @@ class ComprehensiveEvaluator:
             print(f"[WARNING] Error generating answer with context: {e}")
             return f"Error: {str(e)}", []
     
+    async def _agenerate_answer_with_context(self, question: str, semaphore: asyncio.Semaphore) -> tuple:
+        """Async variant of _generate_answer_with_context; the semaphore bounds in-flight LLM calls"""
+        async with semaphore:
+            try:
+                contexts = self._retrieve_contexts(question, top_k=5)
+                
+                context_texts = self._context_texts(question, contexts)
+                
+                answer = await self.generator.agenerate_answer(question, contexts, level="Advanced")
+                return answer, context_texts
+            except Exception as e:
+                print(f"[WARNING] Error generating answer with context: {e}")
+                return f"Error: {str(e)}", []
+    
+    async def _generate_answers_concurrently(self, test_data: List[Dict]) -> List[tuple]:
+        """Generate (answer, context_texts) for every question with bounded concurrency"""
+        semaphore = asyncio.Semaphore(self.config.get('max_concurrent_requests', 8))
+        return await asyncio.gather(*[
+            self._agenerate_answer_with_context(qa['question'], semaphore)
+            for qa in test_data
+        ])
+    
     def _generate_report(self):
         """Generate comprehensive text report"""
         report_path = self.output_dir / f"evaluation_report_{self.results['experiment_id']}.txt"
         
-        with open(report_path, 'w', encoding='utf-8') as f:
-            f.write("="*80 + "\n")
-            f.write("RAG SYSTEM EVALUATION REPORT\n")
-            f.write("="*80 + "\n\n")
-            
-            f.write(f"Experiment ID: {self.results['experiment_id']}\n")
-            f.write(f"Generated: {datetime.now().isoformat()}\n\n")
-            
-            # Dataset statistics
-            f.write("DATASET STATISTICS\n")
-            f.write("-"*80 + "\n")
-            for key, value in self.results['dataset_stats'].items():
-                f.write(f"{key}: {value}\n")
-            f.write("\n")
-            
-            # Retrieval results
-            f.write("RETRIEVAL PERFORMANCE\n")
-            f.write("-"*80 + "\n")
-            for metric, score in self.results['retrieval_results'].items():
-                f.write(f"{metric}: {score:.4f}\n")
-            f.write("\n")
-            
-            # QA results
-            f.write("QA PERFORMANCE\n")
-            f.write("-"*80 + "\n")
-            for metric, score in self.results['qa_results'].items():
-                f.write(f"{metric}: {score:.4f}\n")
-            f.write("\n")
-            
-            # Hallucination results
-            f.write("HALLUCINATION ANALYSIS\n")
-            f.write("-"*80 + "\n")
-            for metric, score in self.results['hallucination_results'].items():
-                f.write(f"{metric}: {score:.4f}\n")
-            f.write("\n")
-            
-            # Verification results (NEW)
-            f.write("VERIFICATION PIPELINE ANALYSIS\n")
-            f.write("-"*80 + "\n")
-            ver_results = self.results['verification_results']
-            if ver_results.get('status') == 'skipped':
-                f.write("Verification pipeline was not available during evaluation.\n")
+        parts = []
+        parts.append("="*80 + "\n")
+        parts.append("RAG SYSTEM EVALUATION REPORT\n")
+        parts.append("="*80 + "\n\n")
+        
+        parts.append(f"Experiment ID: {self.results['experiment_id']}\n")
+        parts.append(f"Generated: {datetime.now().isoformat()}\n\n")
+        
+        # Dataset statistics
+        parts.append("DATASET STATISTICS\n")
+        parts.append("-"*80 + "\n")
+        parts.extend(f"{key}: {value}\n" for key, value in self.results['dataset_stats'].items())
+        parts.append("\n")
+        
+        # Retrieval results
+        parts.append("RETRIEVAL PERFORMANCE\n")
+        parts.append("-"*80 + "\n")
+        parts.extend(f"{metric}: {score:.4f}\n" for metric, score in self.results['retrieval_results'].items())
+        parts.append("\n")
+        
+        # QA results
+        parts.append("QA PERFORMANCE\n")
+        parts.append("-"*80 + "\n")
+        parts.extend(f"{metric}: {score:.4f}\n" for metric, score in self.results['qa_results'].items())
+        parts.append("\n")
+        
+        # Hallucination results
+        parts.append("HALLUCINATION ANALYSIS\n")
+        parts.append("-"*80 + "\n")
+        parts.extend(f"{metric}: {score:.4f}\n" for metric, score in self.results['hallucination_results'].items())
+        parts.append("\n")
+        
+        # Verification results (NEW)
+        parts.append("VERIFICATION PIPELINE ANALYSIS\n")
+        parts.append("-"*80 + "\n")
+        ver_results = self.results['verification_results']
+        if ver_results.get('status') == 'skipped':
+            parts.append("Verification pipeline was not available during evaluation.\n")
+        else:
+            parts.append(f"Abstention Rate: {ver_results.get('abstention_rate', 0)*100:.2f}%\n")
+            parts.append(f"Abstention Count: {ver_results.get('abstention_count', 0)}/{ver_results.get('total_examples', 0)}\n")
+            parts.append(f"Average Safety Score: {ver_results.get('avg_safety_score', 0):.2f}/1.00\n")
+            parts.append(f"Average Certainty: {ver_results.get('avg_certainty', 0)*100:.1f}%\n")
+            parts.append(f"Average Uncertainty: {ver_results.get('avg_uncertainty', 0):.3f}\n\n")
+            
+            parts.append("Hallucination Type Distribution:\n")
+            hall_dist = ver_results.get('hallucination_distribution', {})
+            if hall_dist:
+                for h_type, count in sorted(hall_dist.items(), key=lambda x: x[1], reverse=True):
+                    parts.append(f"  {h_type}: {count}\n")
             else:
-                f.write(f"Abstention Rate: {ver_results.get('abstention_rate', 0)*100:.2f}%\n")
-                f.write(f"Abstention Count: {ver_results.get('abstention_count', 0)}/{ver_results.get('total_examples', 0)}\n")
-                f.write(f"Average Safety Score: {ver_results.get('avg_safety_score', 0):.2f}/1.00\n")
-                f.write(f"Average Certainty: {ver_results.get('avg_certainty', 0)*100:.1f}%\n")
-                f.write(f"Average Uncertainty: {ver_results.get('avg_uncertainty', 0):.3f}\n\n")
-                
-                f.write("Hallucination Type Distribution:\n")
-                hall_dist = ver_results.get('hallucination_distribution', {})
-                if hall_dist:
-                    for h_type, count in sorted(hall_dist.items(), key=lambda x: x[1], reverse=True):
-                        f.write(f"  {h_type}: {count}\n")
-                else:
-                    f.write("  No hallucinations detected\n")
-                f.write("\n")
-                
-                f.write("Severity Distribution:\n")
-                sev_dist = ver_results.get('severity_distribution', {})
-                for severity in ['critical', 'high', 'medium', 'low']:
-                    count = sev_dist.get(severity, 0)
-                    f.write(f"  {severity.capitalize()}: {count}\n")
-            f.write("\n")
-            
-            # Ablation results
-            f.write("ABLATION STUDY RESULTS\n")
-            f.write("-"*80 + "\n")
-            for config, metrics in self.results['ablation_results'].items():
-                f.write(f"\n{config}:\n")
-                for metric, score in metrics.items():
-                    f.write(f"  {metric}: {score:.4f}\n")
-            f.write("\n")
+                parts.append("  No hallucinations detected\n")
+            parts.append("\n")
+            
+            parts.append("Severity Distribution:\n")
+            sev_dist = ver_results.get('severity_distribution', {})
+            for severity in ['critical', 'high', 'medium', 'low']:
+                count = sev_dist.get(severity, 0)
+                parts.append(f"  {severity.capitalize()}: {count}\n")
+        parts.append("\n")
+        
+        # Ablation results
+        parts.append("ABLATION STUDY RESULTS\n")
+        parts.append("-"*80 + "\n")
+        for config, metrics in self.results['ablation_results'].items():
+            parts.append(f"\n{config}:\n")
+            for metric, score in metrics.items():
+                parts.append(f"  {metric}: {score:.4f}\n")
+        parts.append("\n")
+        
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write("".join(parts))
         
         print(f"Report saved: {report_path}")
         
         # Also save as JSON
         json_path = self.output_dir / f"evaluation_results_{self.results['experiment_id']}.json"
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(self.results, f, indent=2)
+        dump_json(self.results, json_path)
         
         print(f"JSON results saved: {json_path}")
     
@@ -715,66 +885,67 @@ class ComprehensiveEvaluator:
         """Export results as LaTeX tables for paper"""
         latex_path = self.output_dir / 'latex_tables.tex'
         
+        parts = []
+        # Retrieval results table
+        parts.append("\\begin{table}[h]\n")
+        parts.append("\\centering\n")
+        parts.append("\\caption{Retrieval Performance}\n")
+        parts.append("\\begin{tabular}{lr}\n")
+        parts.append("\\hline\n")
+        parts.append("Metric & Score \\\\\n")
+        parts.append("\\hline\n")
+        
+        parts.extend(f"{metric} & {score:.4f} \\\\\n" for metric, score in self.results['retrieval_results'].items())
+        
+        parts.append("\\hline\n")
+        parts.append("\\end{tabular}\n")
+        parts.append("\\end{table}\n\n")
+        
+        # QA results table
+        parts.append("\\begin{table}[h]\n")
+        parts.append("\\centering\n")
+        parts.append("\\caption{QA Performance}\n")
+        parts.append("\\begin{tabular}{lr}\n")
+        parts.append("\\hline\n")
+        parts.append("Metric & Score \\\\\n")
+        parts.append("\\hline\n")
+        
+        parts.extend(f"{metric} & {score:.4f} \\\\\n" for metric, score in self.results['qa_results'].items())
+        
+        parts.append("\\hline\n")
+        parts.append("\\end{tabular}\n")
+        parts.append("\\end{table}\n\n")
+        
+        # Verification pipeline table (NEW)
+        ver_results = self.results.get('verification_results', {})
+        if ver_results and ver_results.get('status') != 'skipped':
+            parts.append("\\begin{table}[h]\n")
+            parts.append("\\centering\n")
+            parts.append("\\caption{Verification Pipeline Metrics}\n")
+            parts.append("\\begin{tabular}{lr}\n")
+            parts.append("\\hline\n")
+            parts.append("Metric & Value \\\\\n")
+            parts.append("\\hline\n")
+            
+            parts.append(f"Abstention Rate & {ver_results.get('abstention_rate', 0)*100:.2f}\\% \\\\\n")
+            parts.append(f"Avg Safety Score & {ver_results.get('avg_safety_score', 0):.3f} \\\\\n")
+            parts.append(f"Avg Certainty & {ver_results.get('avg_certainty', 0)*100:.1f}\\% \\\\\n")
+            
+            # Severity distribution
+            sev_dist = ver_results.get('severity_distribution', {})
+            total_hallucinations = sum(sev_dist.values())
+            parts.append(f"Total Hallucinations & {total_hallucinations} \\\\\n")
+            if sev_dist.get('critical', 0) > 0:
+                parts.append(f"Critical Errors & {sev_dist['critical']} \\\\\n")
+            if sev_dist.get('high', 0) > 0:
+                parts.append(f"High Severity & {sev_dist['high']} \\\\\n")
+            
+            parts.append("\\hline\n")
+            parts.append("\\end{tabular}\n")
+            parts.append("\\end{table}\n\n")
+        
         with open(latex_path, 'w', encoding='utf-8') as f:
-            # Retrieval results table
-            f.write("\\begin{table}[h]\n")
-            f.write("\\centering\n")
-            f.write("\\caption{Retrieval Performance}\n")
-            f.write("\\begin{tabular}{lr}\n")
-            f.write("\\hline\n")
-            f.write("Metric & Score \\\\\n")
-            f.write("\\hline\n")
-            
-            for metric, score in self.results['retrieval_results'].items():
-                f.write(f"{metric} & {score:.4f} \\\\\n")
-            
-            f.write("\\hline\n")
-            f.write("\\end{tabular}\n")
-            f.write("\\end{table}\n\n")
-            
-            # QA results table
-            f.write("\\begin{table}[h]\n")
-            f.write("\\centering\n")
-            f.write("\\caption{QA Performance}\n")
-            f.write("\\begin{tabular}{lr}\n")
-            f.write("\\hline\n")
-            f.write("Metric & Score \\\\\n")
-            f.write("\\hline\n")
-            
-            for metric, score in self.results['qa_results'].items():
-                f.write(f"{metric} & {score:.4f} \\\\\n")
-            
-            f.write("\\hline\n")
-            f.write("\\end{tabular}\n")
-            f.write("\\end{table}\n\n")
-            
-            # Verification pipeline table (NEW)
-            ver_results = self.results.get('verification_results', {})
-            if ver_results and ver_results.get('status') != 'skipped':
-                f.write("\\begin{table}[h]\n")
-                f.write("\\centering\n")
-                f.write("\\caption{Verification Pipeline Metrics}\n")
-                f.write("\\begin{tabular}{lr}\n")
-                f.write("\\hline\n")
-                f.write("Metric & Value \\\\\n")
-                f.write("\\hline\n")
-                
-                f.write(f"Abstention Rate & {ver_results.get('abstention_rate', 0)*100:.2f}\\% \\\\\n")
-                f.write(f"Avg Safety Score & {ver_results.get('avg_safety_score', 0):.3f} \\\\\n")
-                f.write(f"Avg Certainty & {ver_results.get('avg_certainty', 0)*100:.1f}\\% \\\\\n")
-                
-                # Severity distribution
-                sev_dist = ver_results.get('severity_distribution', {})
-                total_hallucinations = sum(sev_dist.values())
-                f.write(f"Total Hallucinations & {total_hallucinations} \\\\\n")
-                if sev_dist.get('critical', 0) > 0:
-                    f.write(f"Critical Errors & {sev_dist['critical']} \\\\\n")
-                if sev_dist.get('high', 0) > 0:
-                    f.write(f"High Severity & {sev_dist['high']} \\\\\n")
-                
-                f.write("\\hline\n")
-                f.write("\\end{tabular}\n")
-                f.write("\\end{table}\n\n")
+            f.write("".join(parts))
         
         print(f"LaTeX tables saved: {latex_path}")
 
@@ -9,21 +9,41 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import json
 import random
+from collections import Counter, defaultdict
 from typing import List, Dict, Tuple, Optional
 from datetime import datetime
 import aiohttp
 import asyncio
 from pathlib import Path
+import numpy as np
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def _loads(data):
+    """Parse JSON text, using orjson when available (its errors subclass json.JSONDecodeError)"""
+    return orjson.loads(data) if HAS_ORJSON else json.loads(data)
 
 
 class QADatasetGenerator:
-    """Generate QA pairs from surgical documents"""
+    """
+    Generate QA pairs from surgical documents
+    
+    LLM calls share one aiohttp session. Use the generator as an async context
+    manager (or call aclose()) when calling generate_qa_from_chunk directly;
+    generate_dataset_from_documents manages the session itself.
+    """
     
     def __init__(
         self,
         api_key: str,
         model: str = "openai/gpt-4o",
-        output_dir: str = "evaluation/test_data"
+        output_dir: str = "evaluation/test_data",
+        max_concurrent_requests: int = 8
     ):
         """
         Initialize QA dataset generator
@@ -32,11 +52,32 @@ class QADatasetGenerator:
             api_key: OpenRouter API key
             model: LLM model for QA generation
             output_dir: Directory to save generated datasets
+            max_concurrent_requests: Upper bound on in-flight LLM requests
         """
         self.api_key = api_key
         self.model = model
+        self.max_concurrent_requests = max_concurrent_requests
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.session: Optional[aiohttp.ClientSession] = None
+    
+    async def start(self):
+        """Open the shared HTTP session (a pooled connection reused by every LLM call)"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+    
+    async def aclose(self):
+        """Close the shared HTTP session"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+    
+    async def __aenter__(self):
+        await self.start()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
     
     async def generate_qa_from_chunk(
         self,
@@ -94,51 +135,51 @@ FORMAT YOUR RESPONSE AS JSON:
 
 RESPOND WITH ONLY THE JSON, NO ADDITIONAL TEXT."""
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": self.model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.7,
-                    "response_format": {"type": "json_object"}
-                }
-            ) as resp:
-                result = await resp.json()
-                
-                # Check for API errors
-                if 'error' in result:
-                    print(f"API Error: {result['error']}")
-                    return []
-                
-                # Check for expected response structure
-                if 'choices' not in result:
-                    print(f"Unexpected API response format: {result}")
-                    return []
+        await self.start()
+        async with self.session.post(
+            "https://openrouter.ai/api/v1/chat/completions",
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": self.model,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": 0.7,
+                "response_format": {"type": "json_object"}
+            }
+        ) as resp:
+            result = await resp.json()
+            
+            # Check for API errors
+            if 'error' in result:
+                print(f"API Error: {result['error']}")
+                return []
+            
+            # Check for expected response structure
+            if 'choices' not in result:
+                print(f"Unexpected API response format: {result}")
+                return []
+            
+            response_text = result['choices'][0]['message']['content']
+            
+            try:
+                qa_data = _loads(response_text)
                 
-                response_text = result['choices'][0]['message']['content']
+                # Add metadata
+                for qa in qa_data['questions']:
+                    qa['chunk_id'] = chunk_id
+                    qa['chunk_text'] = chunk_text
+                    qa['generated_at'] = datetime.now().isoformat()
                 
-                try:
-                    qa_data = json.loads(response_text)
-                    
-                    # Add metadata
-                    for qa in qa_data['questions']:
-                        qa['chunk_id'] = chunk_id
-                        qa['chunk_text'] = chunk_text
-                        qa['generated_at'] = datetime.now().isoformat()
-                    
-                    return qa_data['questions']
-                except json.JSONDecodeError:
-                    print(f"Failed to parse JSON from LLM response: {response_text}")
-                    return []
-                except KeyError as e:
-                    print(f"Missing expected key in response: {e}")
-                    print(f"Response data: {qa_data}")
-                    return []
+                return qa_data['questions']
+            except json.JSONDecodeError:
+                print(f"Failed to parse JSON from LLM response: {response_text}")
+                return []
+            except KeyError as e:
+                print(f"Missing expected key in response: {e}")
+                print(f"Response data: {qa_data}")
+                return []
     
     async def generate_dataset_from_documents(
         self,
@@ -157,23 +198,36 @@ RESPOND WITH ONLY THE JSON, NO ADDITIONAL TEXT."""
         Returns:
             List of QA pairs with metadata
         """
-        all_qa_pairs = []
-        
         chunks_to_process = documents[:max_chunks] if max_chunks else documents
         
-        for i, doc in enumerate(chunks_to_process):
-            print(f"Processing chunk {i+1}/{len(chunks_to_process)}: {doc['id']}")
-            
-            qa_pairs = await self.generate_qa_from_chunk(
-                chunk_text=doc['text'],
-                chunk_id=doc['id'],
-                num_questions=questions_per_chunk
+        # Requests run concurrently; the semaphore replaces the old fixed 1s delay
+        # as the rate limit, capping how many are in flight at once
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        
+        async def process_chunk(i: int, doc: Dict) -> List[Dict]:
+            async with semaphore:
+                print(f"Processing chunk {i+1}/{len(chunks_to_process)}: {doc['id']}")
+                return await self.generate_qa_from_chunk(
+                    chunk_text=doc['text'],
+                    chunk_id=doc['id'],
+                    num_questions=questions_per_chunk
+                )
+        
+        # All requests share one session; close it afterwards only if we opened it here
+        owns_session = self.session is None or self.session.closed
+        await self.start()
+        try:
+            # gather preserves input order, so the dataset order matches the documents
+            results = await asyncio.gather(
+                *(process_chunk(i, doc) for i, doc in enumerate(chunks_to_process))
             )
-            
+        finally:
+            if owns_session:
+                await self.aclose()
+        
+        all_qa_pairs = []
+        for qa_pairs in results:
             all_qa_pairs.extend(qa_pairs)
-            
-            # Add small delay to avoid rate limiting
-            await asyncio.sleep(1)
         
         return all_qa_pairs
     
@@ -196,30 +250,28 @@ RESPOND WITH ONLY THE JSON, NO ADDITIONAL TEXT."""
         Returns:
             Tuple of (train_set, test_set)
         """
+        # Still seed the module RNG: create_retrieval_test_set samples distractors with it
         random.seed(random_seed)
+        rng = np.random.default_rng(random_seed)
         
         if stratify_by:
             # Stratified split
-            groups = {}
+            groups = defaultdict(list)
             for qa in qa_pairs:
-                key = qa.get(stratify_by, 'unknown')
-                if key not in groups:
-                    groups[key] = []
-                groups[key].append(qa)
+                groups[qa.get(stratify_by, 'unknown')].append(qa)
             
             train_set, test_set = [], []
             for group_qa in groups.values():
-                random.shuffle(group_qa)
+                perm = rng.permutation(len(group_qa))
                 split_idx = int(len(group_qa) * (1 - test_ratio))
-                train_set.extend(group_qa[:split_idx])
-                test_set.extend(group_qa[split_idx:])
+                train_set.extend(group_qa[i] for i in perm[:split_idx])
+                test_set.extend(group_qa[i] for i in perm[split_idx:])
         else:
-            # Random split
-            shuffled = qa_pairs.copy()
-            random.shuffle(shuffled)
-            split_idx = int(len(shuffled) * (1 - test_ratio))
-            train_set = shuffled[:split_idx]
-            test_set = shuffled[split_idx:]
+            # Random split: permute indices instead of copying and shuffling the list
+            perm = rng.permutation(len(qa_pairs))
+            split_idx = int(len(qa_pairs) * (1 - test_ratio))
+            train_set = [qa_pairs[i] for i in perm[:split_idx]]
+            test_set = [qa_pairs[i] for i in perm[split_idx:]]
         
         return train_set, test_set
     
@@ -248,35 +300,48 @@ RESPOND WITH ONLY THE JSON, NO ADDITIONAL TEXT."""
         
         if include_metadata and len(dataset) > 0:
             # Add statistics (handle both QA format and retrieval format)
-            difficulties = {}
-            answer_types = {}
+            n = len(dataset)
             
             # Check if this is a retrieval test set or QA pairs
             is_retrieval_set = 'query' in dataset[0]
             
             if not is_retrieval_set:
+                # One pass over the dataset for all four statistics
+                difficulties = Counter()
+                answer_types = Counter()
+                question_chars = answer_chars = 0
                 for qa in dataset:
-                    diff = qa.get('difficulty', 'unknown')
-                    atype = qa.get('answer_type', 'unknown')
-                    difficulties[diff] = difficulties.get(diff, 0) + 1
-                    answer_types[atype] = answer_types.get(atype, 0) + 1
+                    difficulties[qa.get('difficulty', 'unknown')] += 1
+                    answer_types[qa.get('answer_type', 'unknown')] += 1
+                    question_chars += len(qa['question'])
+                    answer_chars += len(qa['answer'])
                 
                 data['statistics'] = {
-                    'difficulty_distribution': difficulties,
-                    'answer_type_distribution': answer_types,
-                    'avg_question_length': sum(len(qa['question']) for qa in dataset) / len(dataset),
-                    'avg_answer_length': sum(len(qa['answer']) for qa in dataset) / len(dataset)
+                    'difficulty_distribution': dict(difficulties),
+                    'answer_type_distribution': dict(answer_types),
+                    'avg_question_length': question_chars / n,
+                    'avg_answer_length': answer_chars / n
                 }
             else:
                 # Retrieval test set statistics
+                query_chars = relevant_docs = distractor_docs = 0
+                for qa in dataset:
+                    query_chars += len(qa['query'])
+                    relevant_docs += len(qa['relevant_doc_ids'])
+                    distractor_docs += len(qa.get('distractor_doc_ids', []))
+                
                 data['statistics'] = {
-                    'avg_query_length': sum(len(qa['query']) for qa in dataset) / len(dataset),
-                    'avg_relevant_docs': sum(len(qa['relevant_doc_ids']) for qa in dataset) / len(dataset),
-                    'avg_distractor_docs': sum(len(qa.get('distractor_doc_ids', [])) for qa in dataset) / len(dataset)
+                    'avg_query_length': query_chars / n,
+                    'avg_relevant_docs': relevant_docs / n,
+                    'avg_distractor_docs': distractor_docs / n
                 }
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        if HAS_ORJSON:
+            with open(output_path, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
         
         print(f"Dataset saved to {output_path}")
         print(f"Total examples: {len(dataset)}")
@@ -285,8 +350,8 @@ RESPOND WITH ONLY THE JSON, NO ADDITIONAL TEXT."""
         """Load dataset from JSON file"""
         input_path = self.output_dir / filename
         
-        with open(input_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(input_path, 'rb') as f:
+            data = _loads(f.read())
         
         return data['qa_pairs']
     
@@ -3,11 +3,82 @@ Expert Validation Interface
 Tool for surgical experts to validate QA pairs and measure inter-annotator agreement
 """
 
+import copy
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
-import statistics
+from types import MappingProxyType
+import numpy as np
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+RATING_METRICS = ('correctness', 'relevance', 'difficulty', 'clarity')
+
+# Rating scales are fixed by the instructions (0-5, difficulty 1-3), so the rating value
+# itself is the count-matrix column; no per-call category discovery is needed
+_METRIC_NUM_CATEGORIES = {'correctness': 6, 'relevance': 6, 'difficulty': 4, 'clarity': 6}
+
+# Blank validation form copied into every task item (read-only so it can't be mutated by accident)
+_VALIDATION_TEMPLATE = MappingProxyType({
+    'correctness': None,
+    'relevance': None,
+    'difficulty': None,
+    'clarity': None,
+    'corrected_answer': '',
+    'improved_question': '',
+    'comments': '',
+    'accept': None
+})
+
+
+# Below this many items the NumPy count path is already fast and JIT dispatch isn't worth it
+_NUMBA_MIN_ITEMS = 5000
+
+if HAS_NUMBA:
+    @njit(parallel=True, cache=True)
+    def _fixed_scale_counts_nb(ratings_matrix, num_categories):
+        """Count matrix for on-scale integer ratings; each thread fills its own item rows"""
+        n_items, n_experts = ratings_matrix.shape
+        counts = np.zeros((n_items, num_categories), np.int64)
+        for i in prange(n_items):
+            for j in range(n_experts):
+                v = ratings_matrix[i, j]
+                if not np.isnan(v):
+                    counts[i, int(v)] += 1
+        return counts
+
+
+@lru_cache(maxsize=64)
+def _load_json_cached(path: str, mtime_ns: int, size: int) -> Dict:
+    """Parse a JSON file; mtime and size are part of the cache key so edits invalidate it"""
+    if HAS_ORJSON:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_json(obj, path: Path):
+    """Write indented UTF-8 JSON, using orjson's C encoder when available"""
+    if HAS_ORJSON:
+        path.write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        path.write_text(json.dumps(obj, indent=2, ensure_ascii=False), encoding='utf-8')
 
 
 class ExpertValidator:
@@ -97,17 +168,8 @@ For each question-answer pair, please evaluate:
                     'question': qa['question'],
                     'answer': qa['answer'],
                     'chunk_id': qa.get('chunk_id'),
-                    'supporting_sentences': qa.get('supporting_sentences', []),
-                    'validation': {
-                        'correctness': None,
-                        'relevance': None,
-                        'difficulty': None,
-                        'clarity': None,
-                        'corrected_answer': '',
-                        'improved_question': '',
-                        'comments': '',
-                        'accept': None
-                    }
+                    'supporting_sentences': qa.get('supporting_sentences', ()),
+                    'validation': dict(_VALIDATION_TEMPLATE)
                 }
                 for i, qa in enumerate(qa_pairs)
             ]
@@ -115,8 +177,7 @@ For each question-answer pair, please evaluate:
         
         output_path = self.validation_dir / f"task_{task_id}_{expert_id}.json"
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(task, f, indent=2, ensure_ascii=False)
+        _write_json(task, output_path)
         
         print(f"Validation task created: {output_path}")
         print(f"Expert: {expert_id}")
@@ -125,14 +186,76 @@ For each question-answer pair, please evaluate:
         return str(output_path)
     
     def load_validation_results(self, filepath: str) -> Dict:
-        """Load completed validation results"""
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        """
+        Load completed validation results
+        
+        Parsed files are cached until they change on disk; each call gets its
+        own copy, so callers can modify the result without touching the cache.
+        """
+        path = os.path.abspath(filepath)
+        st = os.stat(path)
+        return copy.deepcopy(_load_json_cached(path, st.st_mtime_ns, st.st_size))
+    
+    @staticmethod
+    def _collect_ratings(
+        validation_results: List[Dict],
+        metrics: Tuple[str, ...] = RATING_METRICS
+    ) -> Dict:
+        """
+        Flatten expert results into parallel arrays (one entry per expert x QA pair)
+        
+        Returns a dict with 'item_ids' / 'expert_ids' / 'questions' (index -> value),
+        'item_idx' and 'expert_idx' int arrays, 'ratings': metric -> float array
+        with NaN where the expert left the rating empty, and 'accept' as an int8
+        array of 1 (accept) / 0 (reject) / -1 (no vote).
+        """
+        item_pos, expert_pos = {}, {}
+        questions = []
+        item_idx, expert_idx, accept = [], [], []
+        ratings = {metric: [] for metric in metrics}
+        
+        for result in validation_results:
+            expert = expert_pos.setdefault(result['expert_id'], len(expert_pos))
+            for qa in result['qa_pairs']:
+                item_id = qa['item_id']
+                if item_id not in item_pos:
+                    item_pos[item_id] = len(item_pos)
+                    questions.append(qa['question'])
+                item_idx.append(item_pos[item_id])
+                expert_idx.append(expert)
+                
+                validation = qa['validation']
+                for metric in metrics:
+                    rating = validation.get(metric)
+                    ratings[metric].append(np.nan if rating is None else rating)
+                vote = validation.get('accept')
+                accept.append(1 if vote is True else 0 if vote is False else -1)
+        
+        return {
+            'item_ids': list(item_pos),
+            'expert_ids': list(expert_pos),
+            'questions': questions,
+            'item_idx': np.asarray(item_idx, dtype=np.int32),
+            'expert_idx': np.asarray(expert_idx, dtype=np.int32),
+            'accept': np.asarray(accept, dtype=np.int8),
+            'ratings': {metric: np.asarray(values, dtype=np.float64) for metric, values in ratings.items()}
+        }
+    
+    @staticmethod
+    def _ratings_matrix(ratings_table: Dict, metric: str) -> np.ndarray:
+        """(items, experts) matrix of one metric, NaN where unrated; items nobody rated are dropped"""
+        values = ratings_table['ratings'][metric]
+        rated = ~np.isnan(values)
+        
+        matrix = np.full((len(ratings_table['item_ids']), len(ratings_table['expert_ids'])), np.nan)
+        matrix[ratings_table['item_idx'][rated], ratings_table['expert_idx'][rated]] = values[rated]
+        return matrix[~np.isnan(matrix).all(axis=1)]
     
     def calculate_inter_annotator_agreement(
         self,
         validation_results: List[Dict],
-        metric: str = 'correctness'
+        metric: str = 'correctness',
+        ratings_table: Optional[Dict] = None
     ) -> Dict:
         """
         Calculate inter-annotator agreement metrics
@@ -140,63 +263,47 @@ For each question-answer pair, please evaluate:
         Args:
             validation_results: List of validation result dicts from multiple experts
             metric: Which validation metric to compare ('correctness', 'relevance', etc.)
+            ratings_table: Optional prebuilt output of _collect_ratings covering this
+                metric; built from validation_results if omitted
             
         Returns:
             Agreement statistics
         """
         # Extract ratings per item
-        item_ratings = {}
-        
-        for result in validation_results:
-            expert_id = result['expert_id']
-            for qa in result['qa_pairs']:
-                item_id = qa['item_id']
-                rating = qa['validation'].get(metric)
-                
-                if rating is not None:
-                    if item_id not in item_ratings:
-                        item_ratings[item_id] = {}
-                    item_ratings[item_id][expert_id] = rating
-        
-        # Calculate agreement metrics
-        agreements = []
-        exact_matches = 0
-        total_comparisons = 0
-        
-        for item_id, ratings in item_ratings.items():
-            if len(ratings) < 2:
-                continue
-            
-            rating_values = list(ratings.values())
-            
-            # Pairwise agreement
-            for i in range(len(rating_values)):
-                for j in range(i + 1, len(rating_values)):
-                    total_comparisons += 1
-                    diff = abs(rating_values[i] - rating_values[j])
-                    
-                    if diff == 0:
-                        exact_matches += 1
-                        agreements.append(1.0)
-                    elif diff <= 1:
-                        agreements.append(0.5)  # Close agreement
-                    else:
-                        agreements.append(0.0)
-        
-        if total_comparisons == 0:
+        if ratings_table is None:
+            ratings_table = self._collect_ratings(validation_results, (metric,))
+        ratings_matrix = self._ratings_matrix(ratings_table, metric)
+        num_items = ratings_matrix.shape[0]
+        
+        # Items rated by a single expert have nothing to compare; mask them out
+        # once and stop early when no item has two ratings
+        ratings_matrix = ratings_matrix[(~np.isnan(ratings_matrix)).sum(axis=1) >= 2]
+        if ratings_matrix.shape[0] == 0:
             return {
                 'error': 'Insufficient data for agreement calculation'
             }
         
-        # Calculate Cohen's Kappa (simplified for multiple raters)
-        observed_agreement = sum(agreements) / len(agreements)
+        # Pairwise agreement over every pair of experts on every item, vectorized;
+        # pairs involving an expert who did not rate the item are NaN and drop out
+        num_experts = ratings_matrix.shape[1]
+        upper_i, upper_j = np.triu_indices(num_experts, k=1)
+        diffs = np.abs(ratings_matrix[:, upper_i] - ratings_matrix[:, upper_j])
+        diffs = diffs[~np.isnan(diffs)]
+        total_comparisons = int(diffs.size)
+        
+        exact_matches = int((diffs == 0).sum())
+        close_matches = int(((diffs > 0) & (diffs <= 1)).sum())
+        
+        # Calculate Cohen's Kappa (simplified for multiple raters):
+        # exact match scores 1.0, close agreement (within 1) scores 0.5
+        observed_agreement = (exact_matches + 0.5 * close_matches) / total_comparisons
         
         # Calculate Fleiss' Kappa for multiple raters
-        kappa = self._calculate_fleiss_kappa(item_ratings)
+        kappa = self._calculate_fleiss_kappa(ratings_matrix, _METRIC_NUM_CATEGORIES.get(metric))
         
         return {
             'metric': metric,
-            'num_items': len(item_ratings),
+            'num_items': num_items,
             'num_comparisons': total_comparisons,
             'exact_match_rate': exact_matches / total_comparisons,
             'agreement_score': observed_agreement,
@@ -204,50 +311,63 @@ For each question-answer pair, please evaluate:
             'interpretation': self._interpret_kappa(kappa)
         }
     
-    def _calculate_fleiss_kappa(self, item_ratings: Dict[int, Dict[str, int]]) -> float:
-        """Calculate Fleiss' Kappa for multiple raters"""
-        items = []
-        for ratings in item_ratings.values():
-            items.append(list(ratings.values()))
-        
-        if not items:
-            return 0.0
-        
-        n = len(items)  # Number of items
-        k = len(items[0])  # Number of raters
+    @staticmethod
+    def _rating_count_matrix(ratings_matrix: np.ndarray, num_categories: Optional[int] = None) -> np.ndarray:
+        """
+        Item x category matrix of how many raters gave each rating to each item
         
-        # Count ratings per category
-        all_ratings = []
-        for item in items:
-            all_ratings.extend(item)
+        With num_categories, integer ratings in [0, num_categories) index the
+        columns directly; otherwise (or for off-scale ratings) categories are
+        discovered with np.unique.
+        """
+        rows, experts = np.nonzero(~np.isnan(ratings_matrix))
+        values = ratings_matrix[rows, experts]
+        
+        if num_categories is not None and np.all((values >= 0) & (values < num_categories) & (values % 1 == 0)):
+            if HAS_NUMBA and ratings_matrix.shape[0] > _NUMBA_MIN_ITEMS:
+                return _fixed_scale_counts_nb(ratings_matrix, num_categories)
+            cols = values.astype(np.intp)
+            width = num_categories
+        else:
+            _, cols = np.unique(values, return_inverse=True)
+            width = cols.max() + 1 if cols.size else 0
         
-        categories = set(all_ratings)
+        counts = np.zeros((ratings_matrix.shape[0], width), dtype=np.int64)
+        np.add.at(counts, (rows, cols), 1)
+        return counts
+    
+    def _calculate_fleiss_kappa(self, ratings_matrix: np.ndarray, num_categories: Optional[int] = None) -> float:
+        """
+        Calculate Fleiss' Kappa for multiple raters
         
-        # Calculate P_i (proportion of agreement for each item)
-        P_i_values = []
-        for item in items:
-            rating_counts = {cat: item.count(cat) for cat in categories}
-            sum_squared = sum(count ** 2 for count in rating_counts.values())
-            P_i = (sum_squared - k) / (k * (k - 1))
-            P_i_values.append(P_i)
+        Computed from the item x category count matrix; items rated by fewer
+        than two experts carry no agreement information and are skipped.
+        Unused categories have zero counts and do not affect the result.
+        """
+        if ratings_matrix.size == 0:
+            return 0.0
         
-        P_bar = sum(P_i_values) / n  # Mean agreement
+        counts = self._rating_count_matrix(ratings_matrix, num_categories)
+        raters = counts.sum(axis=1)
+        counts = counts[raters >= 2]
+        raters = raters[raters >= 2]
+        if counts.shape[0] == 0:
+            return 0.0
         
-        # Calculate P_e (expected agreement by chance)
-        p_j_values = []
-        for cat in categories:
-            count = sum(1 for item in items for rating in item if rating == cat)
-            p_j = count / (n * k)
-            p_j_values.append(p_j ** 2)
+        # P_i: proportion of agreeing rater pairs for each item
+        P_i = ((counts * counts).sum(axis=1) - raters) / (raters * (raters - 1))
+        P_bar = P_i.mean()  # Mean agreement
         
-        P_e = sum(p_j_values)
+        # P_e: expected agreement by chance
+        p_j = counts.sum(axis=0) / raters.sum()
+        P_e = float((p_j ** 2).sum())
         
         # Fleiss' Kappa
         if P_e == 1.0:
             return 1.0
         
         kappa = (P_bar - P_e) / (1 - P_e)
-        return kappa
+        return float(kappa)
     
     def _interpret_kappa(self, kappa: float) -> str:
         """Interpret Kappa value"""
@@ -289,78 +409,79 @@ For each question-answer pair, please evaluate:
             'rejected_items': []
         }
         
-        # Calculate agreement for each metric
-        for metric in ['correctness', 'relevance', 'difficulty', 'clarity']:
+        # Calculate agreement for each metric (ratings for all metrics gathered in one scan)
+        ratings_table = self._collect_ratings(validation_results)
+        for metric in RATING_METRICS:
             agreement = self.calculate_inter_annotator_agreement(
                 validation_results,
-                metric
+                metric,
+                ratings_table=ratings_table
             )
             report['agreement_metrics'][metric] = agreement
         
-        # Aggregate quality scores
-        all_ratings = {
-            'correctness': [],
-            'relevance': [],
-            'difficulty': [],
-            'clarity': []
-        }
-        
-        acceptance_votes = {}
-        
-        for result in validation_results:
-            for qa in result['qa_pairs']:
-                item_id = qa['item_id']
-                validation = qa['validation']
-                
-                for metric in all_ratings.keys():
-                    if validation.get(metric) is not None:
-                        all_ratings[metric].append(validation[metric])
-                
-                # Track acceptance votes
-                if item_id not in acceptance_votes:
-                    acceptance_votes[item_id] = {'accept': 0, 'reject': 0, 'question': qa['question']}
-                
-                if validation.get('accept') is True:
-                    acceptance_votes[item_id]['accept'] += 1
-                elif validation.get('accept') is False:
-                    acceptance_votes[item_id]['reject'] += 1
-        
-        # Calculate statistics
-        for metric, values in all_ratings.items():
-            if values:
+        # Aggregate quality scores from the rating arrays
+        for metric in RATING_METRICS:
+            values = ratings_table['ratings'][metric]
+            values = values[~np.isnan(values)]
+            n = values.size
+            if n:
+                # min/median/max from one partition, mean/stdev from running sums
+                lo, median, hi = np.percentile(values, [0, 50, 100])
+                total = values.sum()
+                sum_sq = np.dot(values, values)
+                variance = max(sum_sq - total * total / n, 0.0) / (n - 1) if n > 1 else 0.0
                 report['quality_statistics'][metric] = {
-                    'mean': statistics.mean(values),
-                    'median': statistics.median(values),
-                    'stdev': statistics.stdev(values) if len(values) > 1 else 0,
-                    'min': min(values),
-                    'max': max(values)
+                    'mean': float(total / n),
+                    'median': float(median),
+                    'stdev': float(np.sqrt(variance)) if n > 1 else 0,
+                    'min': float(lo),
+                    'max': float(hi)
                 }
         
-        # Determine accepted/rejected items (majority vote)
-        for item_id, votes in acceptance_votes.items():
-            total_votes = votes['accept'] + votes['reject']
-            if total_votes == 0:
-                continue
-            
-            acceptance_rate = votes['accept'] / total_votes
-            
-            if acceptance_rate >= 0.5:
-                report['accepted_items'].append(item_id)
-            else:
-                report['rejected_items'].append(item_id)
+        # Determine accepted/rejected items (majority vote), tallying votes per item with bincount
+        num_items = len(ratings_table['item_ids'])
+        item_idx = ratings_table['item_idx']
+        accept = ratings_table['accept']
+        accept_counts = np.bincount(item_idx, weights=accept == 1, minlength=num_items)
+        reject_counts = np.bincount(item_idx, weights=accept == 0, minlength=num_items)
+        voted = (accept_counts + reject_counts) > 0
         
-        report['total_items_validated'] = len(acceptance_votes)
-        report['acceptance_rate'] = len(report['accepted_items']) / len(acceptance_votes) if acceptance_votes else 0
+        item_ids = ratings_table['item_ids']
+        report['accepted_items'] = [item_ids[i] for i in np.flatnonzero(voted & (accept_counts >= reject_counts))]
+        report['rejected_items'] = [item_ids[i] for i in np.flatnonzero(voted & (accept_counts < reject_counts))]
+        
+        report['total_items_validated'] = num_items
+        report['acceptance_rate'] = len(report['accepted_items']) / num_items if num_items else 0
         
         # Save report
         if output_file:
             output_path = self.validation_dir / output_file
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(report, f, indent=2, ensure_ascii=False)
+            _write_json(report, output_path)
             print(f"Validation report saved: {output_path}")
         
         return report
 
+    def generate_validation_report_from_files(
+        self,
+        filepaths: List[str],
+        output_file: Optional[str] = None
+    ) -> Dict:
+        """
+        Load completed expert files in parallel and generate the validation report
+        
+        Args:
+            filepaths: Paths of completed validation task files
+            output_file: Optional file to save report
+            
+        Returns:
+            Report dictionary
+        """
+        # Disk reads overlap across threads; parsed files also land in the load cache
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(filepaths)))) as executor:
+            validation_results = list(executor.map(self.load_validation_results, filepaths))
+        
+        return self.generate_validation_report(validation_results, output_file)
+
 
 if __name__ == "__main__":
     # Example usage
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Evaluation scripts import their siblings (metrics, test_data, ...) as top-level modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
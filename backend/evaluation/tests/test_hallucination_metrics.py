@@ -0,0 +1,8 @@
+from metrics.hallucination_metrics import HallucinationDetector
+
+
+def test_citation_coverage_skips_empty_claims(monkeypatch):
+    detector = HallucinationDetector()
+    monkeypatch.setattr(detector, 'extract_claims', lambda text: ['', 'the appendix was removed'])
+    result = detector.citation_coverage('ignored', ['The appendix was removed laparoscopically'])
+    assert result == {'num_claims': 2, 'supported_claims': 1, 'coverage_ratio': 0.5}
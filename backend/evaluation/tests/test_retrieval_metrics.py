@@ -0,0 +1,19 @@
+import warnings
+
+from metrics.retrieval_metrics import evaluate_retrieval
+
+
+def test_evaluate_retrieval_without_queries():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert evaluate_retrieval([], lambda query: ['doc_1']) == {}
+
+
+def test_evaluate_retrieval_averages_queries():
+    queries = [
+        {'query': 'q1', 'relevant_doc_ids': ['doc_1']},
+        {'query': 'q2', 'relevant_doc_ids': ['doc_9']},
+    ]
+    results = evaluate_retrieval(queries, lambda query: ['doc_1', 'doc_2'], k_values=[1])
+    assert results['Recall@1'] == 0.5
+    assert results['MRR'] == 0.5
@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from run_evaluation import ComprehensiveEvaluator
+
+
+def _evaluator(tmp_path):
+    evaluator = ComprehensiveEvaluator(config_file=str(tmp_path / "missing.json"), output_dir=str(tmp_path))
+    id_to_meta = {
+        0: {'chunk_id': 'a', 'text': 'first'},
+        1: {'chunk_index': 7, 'text': 'no chunk_id'},
+        2: {'text': 'no id at all'},
+        3: {'chunk_id': 0, 'id': 'c'},  # falsy chunk_id falls through to the other keys
+        4: {'chunk_id': 'a', 'text': 'duplicate chunk id'},
+        # 5 has no metadata
+        6: {'id': 'd'},
+    }
+    evaluator.faiss = SimpleNamespace(index=SimpleNamespace(ntotal=7), id_to_meta=id_to_meta)
+    evaluator.embedder = object()
+    evaluator._build_chunk_text_cache()
+    
+    rows = {
+        'q1': [2, 0, 4, 1, -1],
+        'q2': [5, 3, 6, 0, 1],
+        'q3': [1, 2, -1, -1, -1],
+        'q4': [4, 0, 2, 3, 6],
+    }
+    evaluator.query_ids = {q: np.array(ids) for q, ids in rows.items()}
+    # Same shape as FaissManager.to_results: -1 padding dropped, unknown ids get empty metadata
+    evaluator.query_contexts = {
+        q: [{'score': 1.0, 'metadata': id_to_meta.get(i, {})} for i in ids if i >= 0]
+        for q, ids in rows.items()
+    }
+    evaluator.query_contexts_depth = 5
+    evaluator.config['evaluation']['k_values'] = [1, 2, 3, 5]
+    return evaluator
+
+
+def test_batched_retrieval_matches_per_query_path(tmp_path):
+    test_data = [
+        {'question': 'q1', 'chunk_id': 'a'},
+        {'question': 'q2', 'chunk_id': 'c'},
+        {'question': 'q3', 'chunk_id': 7},
+        {'question': 'q4', 'chunk_id': 'd'},
+        {'question': 'q1', 'chunk_id': 'missing'},
+        {'question': 'q2'},
+    ]
+    evaluator = _evaluator(tmp_path)
+    retrieve_contexts = evaluator._retrieve_contexts
+    evaluator._retrieve_contexts = None  # the batched path must not walk the contexts
+    batched = evaluator._evaluate_retrieval(test_data)
+    
+    # Without the id cache every question goes through retrieve_function
+    evaluator._retrieve_contexts = retrieve_contexts
+    evaluator.chunk_ids = None
+    per_query = evaluator._evaluate_retrieval(test_data)
+    
+    assert batched.keys() == per_query.keys()
+    for metric, score in per_query.items():
+        assert batched[metric] == pytest.approx(score), metric
@@ -5,6 +5,7 @@ Checks if the evaluation environment is properly configured
 
 import sys
 import os
+from importlib.util import find_spec
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -44,21 +45,20 @@ def check_environment():
         'seaborn': 'Statistical plots',
     }
     
+    # find_spec only locates the package, so heavy import-time setup
+    # (faiss, transformers, matplotlib) is never run
+    available = {pkg: find_spec(pkg) is not None for pkg in [*required, *optional]}
+    
     for package, purpose in required.items():
-        try:
-            if package == 'faiss':
-                __import__('faiss')
-            else:
-                __import__(package)
+        if available[package]:
             success.append(f"✅ {package} - {purpose}")
-        except ImportError:
+        else:
             issues.append(f"❌ {package} - {purpose} (install: pip install {package if package != 'faiss' else 'faiss-cpu'})")
     
     for package, purpose in optional.items():
-        try:
-            __import__(package.replace('-', '_'))
+        if available[package]:
             success.append(f"✅ {package} - {purpose}")
-        except ImportError:
+        else:
             warnings.append(f"⚠️  {package} - {purpose} (optional)")
     
     # 3. Check file structure
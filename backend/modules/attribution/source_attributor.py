@@ -3,12 +3,30 @@ Source Attribution and Traceability
 Tracks and cites sources for all claims in generated answers.
 """
 
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Set
 import re
 import logging
 
 logger = logging.getLogger(__name__)
 
+_DOC_NAME_SEPARATORS = re.compile(r'[_\-\s]+')
+
+
+@lru_cache(maxsize=1024)
+def _doc_id_for(doc_name: str) -> str:
+    """Short document ID for a document name; memoized since every chunk of a document asks again"""
+    # Remove extension
+    doc_name = doc_name.replace('.pdf', '').replace('.txt', '')
+    
+    # Split on separators
+    parts = _DOC_NAME_SEPARATORS.split(doc_name)
+    
+    # Take first letters of first 2-3 words
+    if len(parts) >= 2:
+        return ''.join([p[0].upper() for p in parts[:min(3, len(parts))]])
+    return doc_name[:3].upper()
+
 
 class SourceAttributor:
     """
@@ -22,7 +40,8 @@ class SourceAttributor:
     """
     
     def __init__(self):
-        self.source_id_pattern = re.compile(r'\[([A-Z0-9\-_]+(?::[A-Z0-9\-_]+)?)\]')
+        # Character classes are ASCII-only, so skip the Unicode tables
+        self.source_id_pattern = re.compile(r'\[([A-Z0-9\-_]+(?::[A-Z0-9\-_]+)?)\]', re.ASCII)
     
     def prepare_contexts_with_source_ids(self, contexts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -37,8 +56,7 @@ class SourceAttributor:
         attributed_contexts = []
         
         for idx, context in enumerate(contexts):
-            context_copy = context.copy()
-            metadata = context_copy.get('metadata', {})
+            metadata = context.get('metadata', {})
             
             # Generate source ID from document name and chunk index
             doc_name = metadata.get('source', 'Unknown')
@@ -48,10 +66,12 @@ class SourceAttributor:
             
             source_id = f"{doc_id}-{chunk_id}"
             
-            context_copy['source_id'] = source_id
-            context_copy['metadata']['source_id'] = source_id
-            
-            attributed_contexts.append(context_copy)
+            # New outer and metadata dicts, so the caller's contexts are left untouched
+            attributed_contexts.append({
+                **context,
+                'source_id': source_id,
+                'metadata': {**metadata, 'source_id': source_id}
+            })
         
         return attributed_contexts
     
@@ -147,7 +167,7 @@ Generate your answer with proper inline citations:
         
         Args:
             answer: Generated answer with citations
-            contexts: Retrieved contexts with source IDs
+            contexts: Contexts from prepare_contexts_with_source_ids() (others are ignored)
         
         Returns:
             Dictionary with verification results:
@@ -159,11 +179,13 @@ Generate your answer with proper inline citations:
                 'hallucination_detected': bool
             }
         """
-        # Extract all source IDs from contexts
-        valid_source_ids = {ctx.get('source_id', '') for ctx in contexts if ctx.get('source_id')}
+        # Extract all source IDs from contexts; contexts that did not go through
+        # prepare_contexts_with_source_ids have none and are skipped
+        valid_source_ids = {source_id for ctx in contexts if (source_id := ctx.get('source_id'))}
         
-        # Extract all cited source IDs from answer
-        cited_ids = set(self.source_id_pattern.findall(answer))
+        # Extract all cited source IDs from answer in a single scan; this pass also
+        # has to see unknown IDs to report them, so a known-ID matcher can't replace it
+        cited_ids = set(self.source_id_pattern.findall(answer)) if '[' in answer else set()
         
         # Find valid and invalid citations
         valid_citations = cited_ids.intersection(valid_source_ids)
@@ -208,12 +230,13 @@ Generate your answer with proper inline citations:
         if not verification.get('hallucination_detected'):
             return answer
         
-        cleaned = answer
-        for invalid_id in verification['invalid_citations']:
-            # Remove the invalid citation
-            cleaned = cleaned.replace(f"[{invalid_id}]", "[SOURCE-NOT-FOUND]")
+        invalid_ids = verification['invalid_citations']
+        if not invalid_ids:
+            return answer
         
-        return cleaned
+        # Replace every invalid citation in one pass over the answer
+        invalid_pattern = re.compile(r'\[(?:' + '|'.join(map(re.escape, invalid_ids)) + r')\]')
+        return invalid_pattern.sub("[SOURCE-NOT-FOUND]", answer)
     
     def format_source_list(self, contexts: List[Dict[str, Any]]) -> str:
         """
@@ -290,16 +313,4 @@ Generate your answer with proper inline citations:
         Returns:
             Short ID (e.g., "ACS-LC" from "ACS_Laparoscopic_Cholecystectomy.pdf")
         """
-        # Remove extension
-        doc_name = doc_name.replace('.pdf', '').replace('.txt', '')
-        
-        # Split on separators
-        parts = re.split(r'[_\-\s]+', doc_name)
-        
-        # Take first letters of first 2-3 words
-        if len(parts) >= 2:
-            doc_id = ''.join([p[0].upper() for p in parts[:min(3, len(parts))]])
-        else:
-            doc_id = doc_name[:3].upper()
-        
-        return doc_id
+        return _doc_id_for(doc_name)
@@ -3,13 +3,49 @@ Retrieval Confidence Scoring
 Computes composite confidence scores for retrieval quality and answer reliability.
 """
 
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Set, Tuple
 import numpy as np
 import logging
 
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
 logger = logging.getLogger(__name__)
 
 
+if HAS_NUMBA:
+    @njit(cache=True)
+    def _score_stats_nb(scores):
+        """Mean, variance and count of the valid scores in one compiled loop, no temporaries"""
+        total = 0.0
+        n = 0
+        for s in scores:
+            if s > -1e30:
+                total += s
+                n += 1
+        if n == 0:
+            return 0.0, 0.0, 0
+        mean = total / n
+        sq = 0.0
+        for s in scores:
+            if s > -1e30:
+                sq += (s - mean) * (s - mean)
+        return mean, sq / n, n
+
+
+def _score_stats(scores: np.ndarray) -> Tuple[float, float, int]:
+    """(mean, variance, count) of retrieval scores, ignoring invalid (<= -1e30) ones"""
+    if HAS_NUMBA:
+        return _score_stats_nb(scores)
+    valid = scores[scores > -1e30]
+    if valid.size == 0:
+        return 0.0, 0.0, 0
+    return float(valid.mean()), float(valid.var()), int(valid.size)
+
+
 class ConfidenceScorer:
     """
     Computes multi-dimensional confidence scores for retrieved results and generated answers.
@@ -73,14 +109,17 @@ class ConfidenceScorer:
                 'warning_message': str (optional)
             }
         """
+        # One pass over the contexts feeds both the similarity and agreement components
+        stats, sources = self._scan_contexts(contexts)
+        
         # Component 1: Retrieval similarity
-        retrieval_sim = self._compute_retrieval_similarity(contexts)
+        retrieval_sim = self._compute_retrieval_similarity(contexts, stats)
         
         # Component 2: Graph coverage
         graph_coverage = self._compute_graph_coverage(query_entities, graph_entities)
         
         # Component 3: Source agreement
-        source_agreement = self._compute_source_agreement(contexts)
+        source_agreement = self._compute_source_agreement(contexts, stats, sources)
         
         # Component 4: Verification score (if available)
         verification = verification_score if verification_score is not None else 1.0
@@ -119,12 +158,32 @@ class ConfidenceScorer:
         
         return result
     
-    def _compute_retrieval_similarity(self, contexts: List[Dict[str, Any]]) -> float:
+    @staticmethod
+    def _scan_contexts(contexts: List[Dict[str, Any]]) -> Tuple[Tuple[float, float, int], Set[str]]:
+        """
+        Collect retrieval scores and source documents in a single pass.
+        
+        Returns:
+            ((mean, variance, count) of the valid scores, set of non-empty sources)
+        """
+        scores = np.empty(len(contexts), dtype=np.float64)
+        sources = set()
+        for i, c in enumerate(contexts):
+            scores[i] = c.get('score', 0.0)
+            source = c.get('metadata', {}).get('source', '')
+            if source:
+                sources.add(source)
+        return _score_stats(scores), sources
+    
+    def _compute_retrieval_similarity(self,
+                                      contexts: List[Dict[str, Any]],
+                                      stats: Optional[Tuple[float, float, int]] = None) -> float:
         """
         Compute average retrieval similarity score.
         
         Args:
             contexts: Retrieved contexts with 'score' field
+            stats: Score statistics from _scan_contexts(contexts) (optional)
         
         Returns:
             Average similarity score (0-1)
@@ -132,22 +191,15 @@ class ConfidenceScorer:
         if not contexts:
             return 0.0
         
-        scores = [c.get('score', 0.0) for c in contexts]
-        
-        # Filter out invalid scores
-        valid_scores = [s for s in scores if s > -1e30]
+        # Average of valid (> -1e30) scores
+        avg_score, _, num_valid = stats if stats is not None else self._scan_contexts(contexts)[0]
         
-        if not valid_scores:
+        if num_valid == 0:
             return 0.0
         
-        # Average of top scores
-        avg_score = np.mean(valid_scores)
-        
         # Normalize to 0-1 if needed (cosine similarity is already 0-1)
         # FAISS scores can be negative for some metrics, so clip
-        normalized = np.clip(avg_score, 0.0, 1.0)
-        
-        return float(normalized)
+        return float(min(max(avg_score, 0.0), 1.0))
     
     def _compute_graph_coverage(self, 
                                 query_entities: Optional[List[str]], 
@@ -178,7 +230,10 @@ class ConfidenceScorer:
         
         return float(coverage)
     
-    def _compute_source_agreement(self, contexts: List[Dict[str, Any]]) -> float:
+    def _compute_source_agreement(self,
+                                  contexts: List[Dict[str, Any]],
+                                  stats: Optional[Tuple[float, float, int]] = None,
+                                  sources: Optional[Set[str]] = None) -> float:
         """
         Compute source agreement: consistency across retrieved chunks.
         
@@ -188,6 +243,8 @@ class ConfidenceScorer:
         
         Args:
             contexts: Retrieved contexts
+            stats: Score statistics from _scan_contexts(contexts) (optional)
+            sources: Distinct sources from _scan_contexts(contexts) (optional)
         
         Returns:
             Agreement score (0-1)
@@ -198,21 +255,16 @@ class ConfidenceScorer:
         if len(contexts) == 1:
             return 0.5  # Single source: medium confidence
         
-        # Check source diversity
-        sources = set()
-        for c in contexts:
-            source = c.get('metadata', {}).get('source', '')
-            if source:
-                sources.add(source)
+        if stats is None or sources is None:
+            stats, sources = self._scan_contexts(contexts)
         
-        # More unique sources = higher agreement
+        # Check source diversity: more unique sources = higher agreement
         source_diversity = len(sources) / len(contexts)
         
         # Check score consistency (lower variance = higher agreement)
-        scores = [c.get('score', 0.0) for c in contexts if c.get('score', 0.0) > -1e30]
+        _, score_variance, num_valid = stats
         
-        if len(scores) >= 2:
-            score_variance = np.var(scores)
+        if num_valid >= 2:
             # Normalize variance: high variance = low consistency
             # Assume variance in range [0, 0.1]
             consistency = 1.0 - min(score_variance * 10, 1.0)
@@ -222,7 +274,7 @@ class ConfidenceScorer:
         # Combine diversity and consistency
         agreement = 0.6 * source_diversity + 0.4 * consistency
         
-        return float(np.clip(agreement, 0.0, 1.0))
+        return float(min(max(agreement, 0.0), 1.0))
     
     def _get_confidence_level(self, overall_confidence: float) -> str:
         """
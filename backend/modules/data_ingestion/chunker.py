@@ -1,4 +1,74 @@
-from typing import List
+import re
+from functools import lru_cache
+from typing import Iterator, List
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+# Below this many characters the regex walk is already fast and JIT dispatch isn't worth it
+_NUMBA_MIN_CHARS = 1_000_000
+
+if HAS_NUMBA:
+    @njit(cache=True)
+    def _chunk_offsets_nb(buf, approx_tokens):
+        """(start, end) byte offsets of each run of approx_tokens words in an ASCII buffer"""
+        n = buf.shape[0]
+        # words <= (n + 1) // 2, so this bounds the number of chunks
+        offsets = np.empty(((n + 1) // (2 * approx_tokens) + 1, 2), np.int64)
+        num_chunks = 0
+        words = 0
+        start = 0
+        i = 0
+        while i < n:
+            # ASCII characters str.isspace() accepts: \t \n \v \f \r, \x1c-\x1f and space
+            b = buf[i]
+            if (9 <= b <= 13) or (28 <= b <= 32):
+                i += 1
+                continue
+            if words == 0:
+                start = i
+            while i < n and not ((9 <= buf[i] <= 13) or (28 <= buf[i] <= 32)):
+                i += 1
+            words += 1
+            if words == approx_tokens:
+                offsets[num_chunks, 0] = start
+                offsets[num_chunks, 1] = i
+                num_chunks += 1
+                words = 0
+        if words:
+            offsets[num_chunks, 0] = start
+            offsets[num_chunks, 1] = i
+            num_chunks += 1
+        return offsets[:num_chunks]
+
+
+@lru_cache(maxsize=16)
+def _chunk_pattern(approx_tokens: int) -> "re.Pattern":
+    # One match = up to approx_tokens whitespace-separated words
+    return re.compile(r"\S+(?:\s+\S+){0,%d}" % (approx_tokens - 1))
+
+
+def iter_chunk_text(text: str, approx_tokens: int = 400) -> Iterator[str]:
+    """
+    Lazily yield the chunks of simple_chunk_text.
+    Walks the original string once instead of materializing a list of every word;
+    each chunk's words are joined with single spaces, as before. Large ASCII texts
+    are scanned by a compiled byte kernel when Numba is available.
+    """
+    if HAS_NUMBA and len(text) >= _NUMBA_MIN_CHARS and text.isascii():
+        buf = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+        for start, end in _chunk_offsets_nb(buf, approx_tokens).tolist():
+            yield " ".join(text[start:end].split())
+        return
+
+    for match in _chunk_pattern(approx_tokens).finditer(text):
+        yield " ".join(match.group().split())
 
 
 def simple_chunk_text(text: str, approx_tokens: int = 400) -> List[str]:
@@ -7,13 +77,4 @@ def simple_chunk_text(text: str, approx_tokens: int = 400) -> List[str]:
     This is an approximation: tokens ~ words for English.
     We use 400 as default to stay well under the 512 token limit of BERT models.
     """
-    words = text.split()
-    chunks = []
-    i = 0
-    n = len(words)
-    while i < n:
-        j = min(n, i + approx_tokens)
-        chunk = " ".join(words[i:j])
-        chunks.append(chunk)
-        i = j
-    return chunks
+    return list(iter_chunk_text(text, approx_tokens))
@@ -2,26 +2,34 @@ from pypdf import PdfReader
 import io
 import re
 
+_CRLF = re.compile(r"\r\n|\r")
+# runs of exactly two newlines are already in canonical form, so only match 3+
+_MULTI_NL = re.compile(r"\n{3,}")
+_NUL_TABLE = str.maketrans("", "", "\x00")
+
 
 def extract_text_from_pdf_bytes(file_bytes: bytes) -> str:
     # Convert bytes to file-like object
     pdf_file = io.BytesIO(file_bytes)
     reader = PdfReader(pdf_file)
-    texts = []
+    # Write pages straight into one buffer instead of collecting and joining a list
+    buf = io.StringIO()
     for page in reader.pages:
         try:
-            texts.append(page.extract_text() or "")
+            text = page.extract_text() or ""
         except Exception:
             # best-effort
             continue
-    full = "\n\n".join(texts)
-    return clean_text(full)
+        if buf.tell():
+            buf.write("\n\n")
+        buf.write(text)
+    return clean_text(buf.getvalue())
 
 
 def clean_text(text: str) -> str:
     # Basic cleaning: normalize whitespace and remove strange control chars
-    text = re.sub(r"\r\n|\r", "\n", text)
-    text = re.sub(r"\u0000", "", text)
+    text = _CRLF.sub("\n", text)
+    text = text.translate(_NUL_TABLE)
     # collapse multiple newlines
-    text = re.sub(r"\n{2,}", "\n\n", text)
+    text = _MULTI_NL.sub("\n\n", text)
     return text.strip()
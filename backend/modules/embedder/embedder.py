@@ -1,4 +1,8 @@
-from typing import List
+import hashlib
+from collections import OrderedDict
+from contextlib import nullcontext
+from pathlib import Path
+from typing import List, Optional, Tuple
 import numpy as np
 from transformers import AutoTokenizer, AutoModel
 import torch
@@ -10,39 +14,186 @@ class BioClinicalEmbedder:
     Notes:
     - This uses huggingface AutoModel and AutoTokenizer.
     - Embedding dimension depends on the model (often 768).
+    - Pass dtype (e.g. "bfloat16", or "float16" on GPU) to load the weights in
+      reduced precision; pooling and normalization still run in float32.
+    - device defaults to "cuda" when available, otherwise "cpu".
+    - autocast=True runs the forward pass of full-precision weights under float16
+      autocast on CUDA. It is off by default, so embeddings match the float32
+      model exactly unless a caller opts in.
+    - compile_model=True wraps the forward pass and mean pooling in torch.compile
+      so the pooling fuses with the encoder's final kernels. Shapes are marked
+      dynamic because batches are padded per length bucket; expect a one-off
+      compilation cost on the first batches.
     """
 
-    def __init__(self, model_name: str):
+    def __init__(
+        self,
+        model_name: str,
+        dtype: Optional[str] = None,
+        device: Optional[str] = None,
+        compile_model: bool = False,
+        autocast: bool = False,
+    ):
         self.model_name = model_name
+        self.dtype = dtype
+        self.autocast = autocast
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
         self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-        self.model = AutoModel.from_pretrained(self.model_name)
+        if dtype:
+            self.model = AutoModel.from_pretrained(self.model_name, torch_dtype=getattr(torch, dtype))
+        else:
+            self.model = AutoModel.from_pretrained(self.model_name)
         self.model.eval()
-        if torch.cuda.is_available():
-            self.model.to("cuda")
+        self.model.to(self.device)
+        self._forward_pool = self._mean_pool_forward
+        if compile_model:
+            self._forward_pool = torch.compile(self._mean_pool_forward, dynamic=True)
 
-    def embed_texts(self, texts: List[str], batch_size: int = 8) -> List[List[float]]:
-        embeddings = []
-        with torch.no_grad():
+    def _mean_pool_forward(self, enc) -> "torch.Tensor":
+        outputs = self.model(**enc)
+        # mean pooling over token dim (take attention mask into account)
+        # upcast before pooling so reduced-precision activations don't affect the mean
+        last_hidden = outputs.last_hidden_state.float()
+        attention_mask = enc["attention_mask"].unsqueeze(-1)
+        masked = last_hidden * attention_mask
+        summed = masked.sum(1)
+        counts = attention_mask.sum(1).clamp(min=1e-9)
+        return summed / counts
+
+    def embed_texts(
+        self,
+        texts: List[str],
+        batch_size: int = 8,
+        out: Optional[np.ndarray] = None,
+        max_length: int = 512,
+    ) -> np.ndarray:
+        """Embed texts with mean pooling.
+
+        Returns a (len(texts), dim) float32 array. When ``out`` is given (a
+        preallocated array of that shape), it is filled in place and returned
+        instead. Rows index and iterate like the old per-text lists, and the
+        array goes straight to FAISS without per-float Python objects.
+
+        Inputs are truncated to ``max_length`` tokens by the tokenizer. Attention
+        cost grows quadratically with sequence length, so callers embedding short
+        texts such as queries can pass a smaller limit (e.g. 128).
+
+        Texts are tokenized once, then batched in order of token length so each
+        batch pads only to similar-length neighbours; results are written back
+        in the original order.
+        """
+        if not texts:
+            return out if out is not None else np.empty((0, self.dim()), dtype=np.float32)
+
+        # Truncate at the token level; padding happens per length-sorted batch below
+        tokens = self.tokenizer(texts, truncation=True, max_length=max_length)
+        order = np.argsort([len(ids) for ids in tokens["input_ids"]], kind="stable")
+
+        # Every batch is scattered into one float32 buffer in the original text order
+        result = out if out is not None else np.empty((len(texts), self.dim()), dtype=np.float32)
+        use_amp = self.autocast and self.device.startswith("cuda") and self.dtype is None
+        amp = torch.autocast(device_type="cuda", dtype=torch.float16) if use_amp else nullcontext()
+        with torch.inference_mode(), amp:
             for i in range(0, len(texts), batch_size):
-                batch = texts[i : i + batch_size]
-                # Explicitly set max_length=512 for proper truncation
-                enc = self.tokenizer(batch, padding=True, truncation=True, max_length=512, return_tensors="pt")
-                if torch.cuda.is_available():
-                    enc = {k: v.to("cuda") for k, v in enc.items()}
-                    self.model.to("cuda")
-                out = self.model(**enc)
-                # mean pooling over token dim (take attention mask into account)
-                last_hidden = out.last_hidden_state
-                attention_mask = enc["attention_mask"].unsqueeze(-1)
-                masked = last_hidden * attention_mask
-                summed = masked.sum(1)
-                counts = attention_mask.sum(1).clamp(min=1e-9)
-                mean_pooled = summed / counts
-                emb = mean_pooled.cpu().numpy()
-                for v in emb:
-                    embeddings.append(v.tolist())
-        return embeddings
+                idx = order[i : i + batch_size]
+                enc = self.tokenizer.pad(
+                    {k: [tokens[k][j] for j in idx] for k in tokens.keys()}, return_tensors="pt"
+                )
+                if self.device.startswith("cuda"):
+                    # pinned host memory lets the copy run asynchronously to the device
+                    enc = {k: v.pin_memory().to(self.device, non_blocking=True) for k, v in enc.items()}
+                elif self.device != "cpu":
+                    enc = {k: v.to(self.device) for k, v in enc.items()}
+                result[idx] = self._forward_pool(enc).numpy(force=True)
+        return result
+
+    def embed_texts_int8(
+        self, texts: List[str], batch_size: int = 8, max_length: int = 512
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Embed texts and quantize each vector to int8 with a symmetric per-vector scale.
+
+        Returns ``(codes, scales)``: an int8 (len(texts), dim) array and a float32
+        (len(texts),) array with ``codes[i] * scales[i] ~= embedding[i]``, a quarter
+        of the float32 footprint. Inner products are recovered as
+        ``(codes_a.astype(np.int32) @ codes_b) * scale_a * scale_b``.
+        """
+        emb = np.empty((len(texts), self.dim()), dtype=np.float32)
+        self.embed_texts(texts, batch_size=batch_size, out=emb, max_length=max_length)
+        scales = np.abs(emb).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0  # all-zero vectors quantize to zeros
+        codes = np.rint(emb / scales[:, None]).clip(-127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
 
     def dim(self) -> int:
         # return hidden size
         return self.model.config.hidden_size
+
+
+class CachedEmbedder:
+    """Wraps an embedder with a per-text on-disk cache.
+
+    Each text's embedding is stored as ``<cache_dir>/<sha256(model, dtype, text)>.npy``,
+    so repeated runs over the same texts skip the model forward pass entirely.
+    The most recently used ``memory_size`` vectors are also kept in memory so
+    repeat lookups within a process skip the disk read. Cache misses are
+    embedded together in one batched call, each distinct text once.
+    """
+
+    def __init__(self, embedder: BioClinicalEmbedder, cache_dir: str = ".cache/embeddings", memory_size: int = 4096):
+        self.embedder = embedder
+        self.model_name = embedder.model_name
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    def _cache_key(self, text: str, max_length: int) -> str:
+        # Autocast embeddings differ from float32 ones; plain float32 keys stay as before
+        precision = self.embedder.dtype
+        if self.embedder.autocast:
+            precision = f"{precision}+autocast"
+        return hashlib.sha256(
+            f"{self.model_name}\0{precision}\0{max_length}\0{text}".encode("utf-8")
+        ).hexdigest()
+
+    def _remember(self, key: str, emb: np.ndarray):
+        self._memory[key] = emb
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        emb = self._memory.get(key)
+        if emb is not None:
+            self._memory.move_to_end(key)
+            return emb
+        path = self.cache_dir / f"{key}.npy"
+        if path.exists():
+            emb = np.load(path)
+            self._remember(key, emb)
+        return emb
+
+    def embed_texts(self, texts: List[str], batch_size: int = 8, max_length: int = 512) -> np.ndarray:
+        keys = [self._cache_key(t, max_length) for t in texts]
+        embeddings = np.empty((len(texts), self.embedder.dim()), dtype=np.float32)
+        misses: "OrderedDict[str, List[int]]" = OrderedDict()
+        for i, key in enumerate(keys):
+            emb = self._lookup(key)
+            if emb is not None:
+                embeddings[i] = emb
+            else:
+                misses.setdefault(key, []).append(i)
+
+        if misses:
+            fresh = np.empty((len(misses), self.embedder.dim()), dtype=np.float32)
+            self.embedder.embed_texts(
+                [texts[idx[0]] for idx in misses.values()], batch_size=batch_size, out=fresh, max_length=max_length
+            )
+            for (key, idx), emb in zip(misses.items(), fresh):
+                np.save(self.cache_dir / f"{key}.npy", emb)
+                self._remember(key, emb.copy())  # a row view would pin the whole batch buffer
+                embeddings[idx] = emb
+        return embeddings
+
+    def dim(self) -> int:
+        return self.embedder.dim()
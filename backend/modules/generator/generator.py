@@ -1,7 +1,16 @@
+import asyncio
+import copy
+import hashlib
+import json
 import os
-from typing import List, Dict, Any, Optional
-from openai import OpenAI as OpenAIClient
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional
+from openai import OpenAI as OpenAIClient, AsyncOpenAI as AsyncOpenAIClient
 import logging
+from ..prompt_engineering.surgical_cot import context_text
 
 logger = logging.getLogger(__name__)
 
@@ -9,6 +18,14 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
 
+# Prompt templates, parsed once at import instead of rebuilt by concatenation per call
+ANSWER_PROMPT_TEMPLATE = (
+    "You are an educational surgical tutor. Do NOT provide clinical advice. "
+    "Level: {level}.\n\nContext:\n{context}\n\nQuestion:\n{query}\n\n"
+    "Answer concisely and include citations to the context segments when possible."
+)
+QUIZ_PROMPT_TEMPLATE = "Create a short {level} quiz (5 Qs) with answers from the context. Context: \n{context}"
+
 
 class Generator:
     def __init__(self, 
@@ -16,7 +33,8 @@ class Generator:
                  base_url: Optional[str] = None, 
                  model: Optional[str] = None,
                  verification_pipeline = None,
-                 surgical_cot_prompter = None):
+                 surgical_cot_prompter = None,
+                 answer_cache_size: int = 256):
         self.openai_api_key = openai_api_key or OPENAI_API_KEY
         self.base_url = base_url or OPENAI_BASE_URL
         self.model = model or OPENAI_MODEL
@@ -28,6 +46,45 @@ class Generator:
             api_key=self.openai_api_key,
             base_url=self.base_url
         ) if self.openai_api_key else None
+        # Async client lets callers overlap many HTTP round-trips (see agenerate_answer)
+        self.async_client = AsyncOpenAIClient(
+            api_key=self.openai_api_key,
+            base_url=self.base_url
+        ) if self.openai_api_key else None
+        
+        # Exact-match LRU of finished answers, keyed by a hash of the prompt; repeated
+        # questions over the same contexts skip the LLM call and verification (0 disables)
+        self.answer_cache_size = answer_cache_size
+        self._answer_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._answer_cache_lock = threading.Lock()
+
+    def _answer_cache_key(self, prompt: str, enable_verification: bool) -> str:
+        return hashlib.blake2b(
+            f"{self.model}\0{enable_verification}\0{prompt}".encode("utf-8"), digest_size=16
+        ).hexdigest()
+
+    def _cached_answer(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._answer_cache_lock:
+            result = self._answer_cache.get(key)
+            if result is None:
+                return None
+            self._answer_cache.move_to_end(key)
+        # Callers may mutate the dict they get back
+        return copy.deepcopy(result)
+
+    def _remember_answer(self, key: str, result: Dict[str, Any]):
+        if self.answer_cache_size <= 0:
+            return
+        # Don't pin a transient verification failure to this prompt
+        verification = result.get("verification")
+        if isinstance(verification, dict) and "error" in verification:
+            return
+        result = copy.deepcopy(result)
+        with self._answer_cache_lock:
+            self._answer_cache[key] = result
+            self._answer_cache.move_to_end(key)
+            if len(self._answer_cache) > self.answer_cache_size:
+                self._answer_cache.popitem(last=False)
 
     def generate_answer(self, 
                        query: str, 
@@ -54,16 +111,11 @@ class Generator:
                 "verification": None
             }
         
-        # Choose prompt strategy
-        if use_surgical_cot and self.surgical_cot_prompter:
-            prompt = self.surgical_cot_prompter.build_adaptive_cot_prompt(query, contexts, level)
-            logger.info("Using surgical Chain-of-Thought prompting")
-        else:
-            # Standard prompt
-            context_texts = "\n\n".join([c.get("metadata", {}).get("text", "") for c in contexts])
-            prompt = f"You are an educational surgical tutor. Do NOT provide clinical advice. "
-            prompt += f"Level: {level}.\n\nContext:\n{context_texts}\n\nQuestion:\n{query}\n\nAnswer concisely and include citations to the context segments when possible."
-            logger.info("Using standard prompting")
+        prompt = self._build_answer_prompt(query, contexts, level, use_surgical_cot)
+        cache_key = self._answer_cache_key(prompt, enable_verification)
+        cached = self._cached_answer(cache_key)
+        if cached is not None:
+            return cached
         
         try:
             response = self.client.chat.completions.create(
@@ -72,27 +124,53 @@ class Generator:
                 max_tokens=800  # Increased for CoT reasoning
             )
             answer_text = response.choices[0].message.content
+            result = self._finalize_answer(query, answer_text, enable_verification, use_surgical_cot)
+            self._remember_answer(cache_key, result)
+            return result
             
-            # Perform verification if enabled and pipeline available
-            verification_report = None
-            if enable_verification and self.verification_pipeline:
-                try:
-                    logger.info("Running answer verification...")
-                    verification_report = self.verification_pipeline.verify_answer(query, answer_text)
-                    
-                    # Append verification summary to answer
-                    verification_summary = self.verification_pipeline.format_verification_for_user(verification_report)
-                    answer_text += verification_summary
-                    
-                except Exception as e:
-                    logger.error(f"Verification failed: {e}")
-                    verification_report = {"error": str(e)}
-            
+        except Exception as e:
+            return {
+                "answer": f"Error generating response: {str(e)}",
+                "verification": None,
+                "used_surgical_cot": False
+            }
+
+    async def agenerate_answer(self, 
+                               query: str, 
+                               contexts: List[Dict[str, Any]], 
+                               level: str = "Novice",
+                               enable_verification: bool = True,
+                               use_surgical_cot: bool = True) -> Dict[str, Any]:
+        """
+        Async variant of generate_answer. Same arguments and return value, but the
+        LLM request is awaited so several answers can be generated concurrently.
+        """
+        if not self.async_client:
             return {
-                "answer": answer_text,
-                "verification": verification_report,
-                "used_surgical_cot": use_surgical_cot and self.surgical_cot_prompter is not None
+                "answer": "Error: OpenAI API key not configured",
+                "verification": None
             }
+        
+        prompt = self._build_answer_prompt(query, contexts, level, use_surgical_cot)
+        cache_key = self._answer_cache_key(prompt, enable_verification)
+        cached = self._cached_answer(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=800  # Increased for CoT reasoning
+            )
+            answer_text = response.choices[0].message.content
+            # Verification is blocking graph/NLP work; run it off the event loop so
+            # other in-flight generations keep streaming while this answer is checked
+            result = await asyncio.to_thread(
+                self._finalize_answer, query, answer_text, enable_verification, use_surgical_cot
+            )
+            self._remember_answer(cache_key, result)
+            return result
             
         except Exception as e:
             return {
@@ -101,13 +179,111 @@ class Generator:
                 "used_surgical_cot": False
             }
 
+    def stream_answer(self, 
+                      query: str, 
+                      contexts: List[Dict[str, Any]], 
+                      level: str = "Novice",
+                      use_surgical_cot: bool = True) -> Iterator[str]:
+        """
+        Stream the answer text as the LLM produces it, so the first words reach the
+        user after one token's latency instead of the whole completion's.
+        
+        Verification needs the complete answer, so it is not applied here; use
+        generate_answer when a verification report is required.
+        """
+        if not self.client:
+            yield "Error: OpenAI API key not configured"
+            return
+        
+        prompt = self._build_answer_prompt(query, contexts, level, use_surgical_cot)
+        
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=800,
+                stream=True
+            )
+            for event in stream:
+                delta = event.choices[0].delta.content if event.choices else None
+                if delta:
+                    yield delta
+        except Exception as e:
+            yield f"Error generating response: {str(e)}"
+
+    async def astream_answer(self, 
+                             query: str, 
+                             contexts: List[Dict[str, Any]], 
+                             level: str = "Novice",
+                             use_surgical_cot: bool = True) -> AsyncIterator[str]:
+        """Async variant of stream_answer, for serving the stream from the API"""
+        if not self.async_client:
+            yield "Error: OpenAI API key not configured"
+            return
+        
+        prompt = self._build_answer_prompt(query, contexts, level, use_surgical_cot)
+        
+        try:
+            stream = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=800,
+                stream=True
+            )
+            async for event in stream:
+                delta = event.choices[0].delta.content if event.choices else None
+                if delta:
+                    yield delta
+        except Exception as e:
+            yield f"Error generating response: {str(e)}"
+
+    def _build_answer_prompt(self, 
+                             query: str, 
+                             contexts: List[Dict[str, Any]], 
+                             level: str, 
+                             use_surgical_cot: bool) -> str:
+        """Choose the prompt strategy and build the answer prompt"""
+        if use_surgical_cot and self.surgical_cot_prompter:
+            prompt = self.surgical_cot_prompter.build_adaptive_cot_prompt(query, contexts, level)
+            logger.info("Using surgical Chain-of-Thought prompting")
+        else:
+            # Standard prompt
+            prompt = ANSWER_PROMPT_TEMPLATE.format(level=level, context=context_text(contexts), query=query)
+            logger.info("Using standard prompting")
+        return prompt
+
+    def _finalize_answer(self, 
+                         query: str, 
+                         answer_text: str, 
+                         enable_verification: bool, 
+                         use_surgical_cot: bool) -> Dict[str, Any]:
+        """Run optional verification on a generated answer and build the result dict"""
+        verification_report = None
+        if enable_verification and self.verification_pipeline:
+            try:
+                logger.info("Running answer verification...")
+                verification_report = self.verification_pipeline.verify_answer(query, answer_text)
+                
+                # Append verification summary to answer
+                verification_summary = self.verification_pipeline.format_verification_for_user(verification_report)
+                answer_text += verification_summary
+                
+            except Exception as e:
+                logger.error(f"Verification failed: {e}")
+                verification_report = {"error": str(e)}
+        
+        return {
+            "answer": answer_text,
+            "verification": verification_report,
+            "used_surgical_cot": use_surgical_cot and self.surgical_cot_prompter is not None
+        }
+
     def generate_quiz(self, contexts: List[Dict[str, Any]], level: str = "Novice") -> Dict[str, Any]:
         # simple placeholder — in production use a template and structured output
         if not self.client:
             return {"quiz_text": "Error: OpenAI API key not configured"}
         
-        prompt = f"Create a short {level} quiz (5 Qs) with answers from the context. Context: \n"
-        prompt += "\n\n".join([c.get("metadata", {}).get("text", "") for c in contexts])
+        prompt = QUIZ_PROMPT_TEMPLATE.format(level=level, context=context_text(contexts))
         
         try:
             response = self.client.chat.completions.create(
@@ -118,3 +294,156 @@ class Generator:
             return {"quiz_text": response.choices[0].message.content}
         except Exception as e:
             return {"quiz_text": f"Error generating quiz: {str(e)}"}
+
+    def generate_quiz_batch(self, 
+                            context_lists: List[List[Dict[str, Any]]], 
+                            level: str = "Novice",
+                            poll_interval: float = 30.0,
+                            timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Generate quizzes for many context lists through the OpenAI Batch API.
+        
+        For bulk, non-interactive jobs: the requests are uploaded as one JSONL file
+        and completed asynchronously by the provider (within 24h, at a lower price
+        than chat completions), so this blocks while polling. Providers without
+        /v1/batches (e.g. OpenRouter) fall back to generate_quiz on a thread pool.
+        
+        Args:
+            context_lists: One list of retrieved contexts per quiz
+            level: Educational level (Novice/Intermediate/Advanced)
+            poll_interval: Seconds between batch status checks
+            timeout: Give up waiting after this many seconds (None waits for the batch window)
+        
+        Returns:
+            Quiz dicts (as from generate_quiz) in the same order as context_lists
+        """
+        if not self.client:
+            return [{"quiz_text": "Error: OpenAI API key not configured"} for _ in context_lists]
+        if not context_lists:
+            return []
+        
+        lines = [
+            json.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": [{
+                        "role": "user",
+                        "content": QUIZ_PROMPT_TEMPLATE.format(level=level, context=context_text(contexts))
+                    }],
+                    "max_tokens": 500
+                }
+            })
+            for i, contexts in enumerate(context_lists)
+        ]
+        
+        try:
+            batch_file = self.client.files.create(
+                file=("quiz_batch.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch"
+            )
+            batch = self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+        except Exception as e:
+            logger.warning(f"Batch API unavailable ({e}); generating quizzes one request at a time")
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                return list(pool.map(lambda contexts: self.generate_quiz(contexts, level=level), context_lists))
+        
+        logger.info(f"Submitted quiz batch {batch.id} with {len(lines)} requests")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            if deadline is not None and time.monotonic() >= deadline:
+                return [{"quiz_text": f"Error generating quiz: batch {batch.id} still {batch.status}"}
+                        for _ in context_lists]
+            time.sleep(poll_interval)
+            batch = self.client.batches.retrieve(batch.id)
+        
+        results = [{"quiz_text": f"Error generating quiz: batch {batch.status}"} for _ in context_lists]
+        # An expired batch still returns the requests that finished in time
+        if batch.output_file_id:
+            for line in self.client.files.content(batch.output_file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                i = int(record["custom_id"])
+                response = record.get("response") or {}
+                if response.get("status_code") == 200:
+                    results[i] = {"quiz_text": response["body"]["choices"][0]["message"]["content"]}
+                else:
+                    error = record.get("error") or response.get("body", {}).get("error")
+                    results[i] = {"quiz_text": f"Error generating quiz: {error}"}
+        return results
+
+    async def agenerate_quiz(self, contexts: List[Dict[str, Any]], level: str = "Novice") -> Dict[str, Any]:
+        """Async variant of generate_quiz"""
+        if not self.async_client:
+            return {"quiz_text": "Error: OpenAI API key not configured"}
+        
+        prompt = QUIZ_PROMPT_TEMPLATE.format(level=level, context=context_text(contexts))
+        
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=500
+            )
+            return {"quiz_text": response.choices[0].message.content}
+        except Exception as e:
+            return {"quiz_text": f"Error generating quiz: {str(e)}"}
+
+    async def agenerate_answer_and_quiz(self, 
+                                        query: str, 
+                                        contexts: List[Dict[str, Any]], 
+                                        level: str = "Novice",
+                                        **answer_kwargs) -> tuple:
+        """
+        Generate an answer and a quiz for the same contexts with both LLM requests
+        in flight at once, so the pair costs one round-trip instead of two.
+        
+        Returns:
+            (answer dict as from generate_answer, quiz dict as from generate_quiz)
+        """
+        answer, quiz = await asyncio.gather(
+            self.agenerate_answer(query, contexts, level=level, **answer_kwargs),
+            self.agenerate_quiz(contexts, level=level)
+        )
+        return answer, quiz
+
+    async def agenerate_answers_batch(self, 
+                                      items: List[Dict[str, Any]], 
+                                      max_concurrency: int = 8) -> List[Dict[str, Any]]:
+        """
+        Generate answers for many queries with up to max_concurrency LLM requests in flight.
+        
+        Args:
+            items: One dict per query with agenerate_answer keyword arguments
+                   ('query', 'contexts', and optionally 'level', etc.)
+            max_concurrency: Upper bound on simultaneous requests
+        
+        Returns:
+            Answer dicts in the same order as items
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def _one(item: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.agenerate_answer(**item)
+        
+        return list(await asyncio.gather(*(_one(item) for item in items)))
+
+    def generate_answers_batch(self, 
+                               items: List[Dict[str, Any]], 
+                               max_concurrency: int = 8) -> List[Dict[str, Any]]:
+        """
+        Synchronous counterpart of agenerate_answers_batch for callers without an event loop.
+        
+        Runs generate_answer on a thread pool rather than asyncio.run, since the shared
+        async client's connections are bound to the loop that first used them.
+        """
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            return list(pool.map(lambda item: self.generate_answer(**item), items))
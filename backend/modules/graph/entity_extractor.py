@@ -5,13 +5,153 @@ Identifies procedures, anatomy, instruments, complications, and techniques.
 """
 
 import spacy
-from spacy.matcher import PhraseMatcher
-from typing import Dict, List, Set, Tuple
+from spacy.matcher import DependencyMatcher, PhraseMatcher
+from spacy.tokens import Doc, Span
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from collections import Counter
+from functools import lru_cache
 import logging
 import re
 
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
 logger = logging.getLogger(__name__)
 
+# verb -> (nsubj | nsubjpass) child and verb -> (dobj | pobj) child
+SVO_PATTERN = [
+    {"RIGHT_ID": "verb", "RIGHT_ATTRS": {"POS": "VERB"}},
+    {"LEFT_ID": "verb", "REL_OP": ">", "RIGHT_ID": "subject",
+     "RIGHT_ATTRS": {"DEP": {"IN": ["nsubj", "nsubjpass"]}}},
+    {"LEFT_ID": "verb", "REL_OP": ">", "RIGHT_ID": "object",
+     "RIGHT_ATTRS": {"DEP": {"IN": ["dobj", "pobj"]}}}
+]
+
+# Entity category for each ScispaCy NER label we keep
+NER_LABEL_CATEGORIES = {
+    'PROCEDURE': 'procedures', 'TREATMENT': 'procedures',
+    'ANATOMY': 'anatomy', 'ORGAN': 'anatomy', 'TISSUE': 'anatomy',
+    'DEVICE': 'instruments', 'EQUIPMENT': 'instruments',
+    'DISEASE': 'complications', 'SYMPTOM': 'complications', 'ADVERSE_EVENT': 'complications',
+    'MEDICATION': 'medications', 'DRUG': 'medications', 'CHEMICAL': 'medications'
+}
+
+# Entity category for each custom dictionary label
+DICTIONARY_LABEL_CATEGORIES = {
+    'PROCEDURE': 'procedures',
+    'ANATOMY': 'anatomy',
+    'INSTRUMENT': 'instruments',
+    'COMPLICATION': 'complications',
+    'TECHNIQUE': 'techniques',
+    'MEDICATION': 'medications'
+}
+
+
+# Common surgical procedures
+PROCEDURES = frozenset({
+    'appendectomy', 'cholecystectomy', 'colectomy', 'gastrectomy',
+    'mastectomy', 'hysterectomy', 'prostatectomy', 'nephrectomy',
+    'splenectomy', 'thyroidectomy', 'laparoscopy', 'arthroscopy',
+    'craniotomy', 'thoracotomy', 'laparotomy', 'cesarean section',
+    'hernia repair', 'bypass surgery', 'angioplasty', 'amputation',
+    'biopsy', 'debridement', 'excision', 'resection', 'anastomosis',
+    'tracheostomy', 'colostomy', 'ileostomy', 'catheterization'
+})
+
+# Anatomical structures commonly involved in surgery
+ANATOMY = frozenset({
+    'appendix', 'gallbladder', 'colon', 'stomach', 'intestine',
+    'liver', 'pancreas', 'spleen', 'kidney', 'bladder', 'uterus',
+    'prostate', 'breast', 'thyroid', 'heart', 'lung', 'brain',
+    'spine', 'bone', 'muscle', 'tendon', 'ligament', 'cartilage',
+    'artery', 'vein', 'nerve', 'skin', 'fascia', 'peritoneum',
+    'pleura', 'pericardium', 'esophagus', 'trachea', 'bronchus',
+    'duodenum', 'jejunum', 'ileum', 'cecum', 'rectum', 'anus'
+})
+
+# Surgical instruments
+INSTRUMENTS = frozenset({
+    'scalpel', 'forceps', 'scissors', 'retractor', 'clamp', 'needle',
+    'suture', 'stapler', 'cautery', 'electrocautery', 'laser',
+    'laparoscope', 'endoscope', 'trocar', 'dilator', 'probe',
+    'curette', 'drain', 'catheter', 'speculum', 'syringe',
+    'aspirator', 'irrigator', 'ultrasound', 'microscope', 'drill',
+    'saw', 'chisel', 'hammer', 'tourniquet', 'compress'
+})
+
+# Common complications
+COMPLICATIONS = frozenset({
+    'bleeding', 'hemorrhage', 'infection', 'sepsis', 'abscess',
+    'perforation', 'leak', 'fistula', 'stenosis', 'obstruction',
+    'ileus', 'adhesion', 'hernia', 'dehiscence', 'necrosis',
+    'thrombosis', 'embolism', 'stroke', 'infarction', 'ischemia',
+    'pneumonia', 'atelectasis', 'edema', 'hematoma', 'seroma',
+    'pain', 'nausea', 'vomiting', 'fever', 'shock', 'death'
+})
+
+# Surgical techniques and approaches
+TECHNIQUES = frozenset({
+    'laparoscopic', 'open', 'minimally invasive', 'robotic',
+    'endoscopic', 'percutaneous', 'transabdominal', 'transthoracic',
+    'anterior', 'posterior', 'lateral', 'medial', 'proximal', 'distal',
+    'radical', 'partial', 'total', 'complete', 'incomplete',
+    'primary', 'secondary', 'elective', 'emergency', 'urgent'
+})
+
+# Medications commonly used in surgery
+MEDICATIONS = frozenset({
+    'antibiotic', 'antibiotics', 'anesthesia', 'anesthetic',
+    'analgesic', 'painkiller', 'opioid', 'morphine', 'fentanyl',
+    'anticoagulant', 'heparin', 'warfarin', 'aspirin',
+    'steroid', 'corticosteroid', 'insulin', 'saline',
+    'epinephrine', 'atropine', 'propofol', 'midazolam',
+    'cefazolin', 'metronidazole', 'gentamicin', 'vancomycin'
+})
+
+# Dictionary label -> terms
+SURGICAL_DICTIONARIES = {
+    'PROCEDURE': PROCEDURES,
+    'ANATOMY': ANATOMY,
+    'INSTRUMENT': INSTRUMENTS,
+    'COMPLICATION': COMPLICATIONS,
+    'TECHNIQUE': TECHNIQUES,
+    'MEDICATION': MEDICATIONS
+}
+
+
+@lru_cache(maxsize=1)
+def _dictionary_automaton() -> "ahocorasick.Automaton":
+    """Aho-Corasick automaton over every dictionary term, values (label, term)."""
+    automaton = ahocorasick.Automaton()
+    for label, terms in SURGICAL_DICTIONARIES.items():
+        for term in terms:
+            automaton.add_word(term, (label, term))
+    automaton.make_automaton()
+    return automaton
+
+
+def _is_token_boundary(text: str, start: int, end: int) -> bool:
+    """True if text[start:end] is not glued to letters/digits on either side."""
+    return ((start == 0 or not text[start - 1].isalnum())
+            and (end == len(text) or not text[end].isalnum()))
+
+
+def _count_whole_words(term: str, text: str) -> int:
+    """Non-overlapping occurrences of term in text that are whole words (see _is_token_boundary)."""
+    count = 0
+    start = text.find(term)
+    while start != -1:
+        end = start + len(term)
+        if _is_token_boundary(text, start, end):
+            count += 1
+            start = text.find(term, end)
+        else:
+            start = text.find(term, start + 1)
+    return count
+
 
 class MedicalEntityExtractor:
     """
@@ -21,13 +161,21 @@ class MedicalEntityExtractor:
     3. Pattern matching for specific medical terms
     """
     
-    def __init__(self, model_name: str = "en_core_sci_md"):
+    def __init__(self, model_name: str = "en_core_sci_md", use_gpu: bool = False):
         """
         Initialize the medical entity extractor.
         
         Args:
             model_name: ScispaCy model name (en_core_sci_sm, en_core_sci_md, en_core_sci_lg)
+            use_gpu: Run the pipeline on a CUDA device if one is available (needs cupy)
         """
+        # Must happen before spacy.load so the model's weights are allocated on the GPU
+        if use_gpu:
+            if spacy.prefer_gpu():
+                logger.info("ScispaCy will run on GPU")
+            else:
+                logger.warning("use_gpu set but no GPU is available to spaCy, running on CPU")
+        
         try:
             self.nlp = spacy.load(model_name)
             logger.info(f"Loaded ScispaCy model: {model_name}")
@@ -35,93 +183,46 @@ class MedicalEntityExtractor:
             logger.error(f"ScispaCy model '{model_name}' not found. Run: pip install {model_name}")
             raise
         
+        # Lemmas are never read (matching is on LOWER, relationships on POS/deps)
+        if "lemmatizer" in self.nlp.pipe_names:
+            self.nlp.disable_pipe("lemmatizer")
+        
         # Initialize phrase matcher for custom terms
         self.matcher = PhraseMatcher(self.nlp.vocab, attr="LOWER")
         
         # Load custom medical dictionaries
         self._load_surgical_dictionaries()
         self._add_custom_patterns()
+        
+        # Subject-verb-object relationships are matched on the dependency parse in one call
+        self.dep_matcher = DependencyMatcher(self.nlp.vocab)
+        self.dep_matcher.add("SVO", [SVO_PATTERN])
     
     def _load_surgical_dictionaries(self):
-        """Load curated lists of surgical terms."""
-        
-        # Common surgical procedures
-        self.procedures = {
-            'appendectomy', 'cholecystectomy', 'colectomy', 'gastrectomy',
-            'mastectomy', 'hysterectomy', 'prostatectomy', 'nephrectomy',
-            'splenectomy', 'thyroidectomy', 'laparoscopy', 'arthroscopy',
-            'craniotomy', 'thoracotomy', 'laparotomy', 'cesarean section',
-            'hernia repair', 'bypass surgery', 'angioplasty', 'amputation',
-            'biopsy', 'debridement', 'excision', 'resection', 'anastomosis',
-            'tracheostomy', 'colostomy', 'ileostomy', 'catheterization'
-        }
-        
-        # Anatomical structures commonly involved in surgery
-        self.anatomy = {
-            'appendix', 'gallbladder', 'colon', 'stomach', 'intestine',
-            'liver', 'pancreas', 'spleen', 'kidney', 'bladder', 'uterus',
-            'prostate', 'breast', 'thyroid', 'heart', 'lung', 'brain',
-            'spine', 'bone', 'muscle', 'tendon', 'ligament', 'cartilage',
-            'artery', 'vein', 'nerve', 'skin', 'fascia', 'peritoneum',
-            'pleura', 'pericardium', 'esophagus', 'trachea', 'bronchus',
-            'duodenum', 'jejunum', 'ileum', 'cecum', 'rectum', 'anus'
-        }
-        
-        # Surgical instruments
-        self.instruments = {
-            'scalpel', 'forceps', 'scissors', 'retractor', 'clamp', 'needle',
-            'suture', 'stapler', 'cautery', 'electrocautery', 'laser',
-            'laparoscope', 'endoscope', 'trocar', 'dilator', 'probe',
-            'curette', 'drain', 'catheter', 'speculum', 'syringe',
-            'aspirator', 'irrigator', 'ultrasound', 'microscope', 'drill',
-            'saw', 'chisel', 'hammer', 'tourniquet', 'compress'
-        }
-        
-        # Common complications
-        self.complications = {
-            'bleeding', 'hemorrhage', 'infection', 'sepsis', 'abscess',
-            'perforation', 'leak', 'fistula', 'stenosis', 'obstruction',
-            'ileus', 'adhesion', 'hernia', 'dehiscence', 'necrosis',
-            'thrombosis', 'embolism', 'stroke', 'infarction', 'ischemia',
-            'pneumonia', 'atelectasis', 'edema', 'hematoma', 'seroma',
-            'pain', 'nausea', 'vomiting', 'fever', 'shock', 'death'
-        }
-        
-        # Surgical techniques and approaches
-        self.techniques = {
-            'laparoscopic', 'open', 'minimally invasive', 'robotic',
-            'endoscopic', 'percutaneous', 'transabdominal', 'transthoracic',
-            'anterior', 'posterior', 'lateral', 'medial', 'proximal', 'distal',
-            'radical', 'partial', 'total', 'complete', 'incomplete',
-            'primary', 'secondary', 'elective', 'emergency', 'urgent'
-        }
-        
-        # Medications commonly used in surgery
-        self.medications = {
-            'antibiotic', 'antibiotics', 'anesthesia', 'anesthetic',
-            'analgesic', 'painkiller', 'opioid', 'morphine', 'fentanyl',
-            'anticoagulant', 'heparin', 'warfarin', 'aspirin',
-            'steroid', 'corticosteroid', 'insulin', 'saline',
-            'epinephrine', 'atropine', 'propofol', 'midazolam',
-            'cefazolin', 'metronidazole', 'gentamicin', 'vancomycin'
-        }
+        """Load curated lists of surgical terms (shared module-level frozensets)."""
+        self.procedures = PROCEDURES
+        self.anatomy = ANATOMY
+        self.instruments = INSTRUMENTS
+        self.complications = COMPLICATIONS
+        self.techniques = TECHNIQUES
+        self.medications = MEDICATIONS
     
     def _add_custom_patterns(self):
         """Add custom phrase patterns to the matcher."""
         
-        # Add patterns for each entity type
-        pattern_dict = {
-            'PROCEDURE': self.procedures,
-            'ANATOMY': self.anatomy,
-            'INSTRUMENT': self.instruments,
-            'COMPLICATION': self.complications,
-            'TECHNIQUE': self.techniques,
-            'MEDICATION': self.medications
-        }
-        
-        for label, terms in pattern_dict.items():
-            patterns = [self.nlp.make_doc(text) for text in terms]
-            self.matcher.add(label, patterns)
+        # With pyahocorasick, one automaton over every term scans the raw text in a
+        # single pass; it only depends on the dictionaries, so it is built once per process
+        self.automaton = None
+        if HAS_AHOCORASICK:
+            self.automaton = _dictionary_automaton()
+            return
+        
+        # All labels share the one matcher; match ids are routed back to labels
+        # through a prebuilt dict instead of a string-store lookup per hit
+        self._match_labels = {}
+        for label, terms in SURGICAL_DICTIONARIES.items():
+            self.matcher.add(label, list(self.nlp.tokenizer.pipe(terms)))
+            self._match_labels[self.nlp.vocab.strings[label]] = label
     
     def extract_entities(self, text: str) -> Dict[str, List[str]]:
         """
@@ -133,8 +234,45 @@ class MedicalEntityExtractor:
         Returns:
             Dictionary with entity types as keys and lists of entity names as values
         """
-        doc = self.nlp(text.lower())
+        return self._entities_from_doc(self.nlp(text), text.lower())
+    
+    def extract_entities_batch(self,
+                               texts: Iterable[str],
+                               batch_size: int = 64,
+                               n_process: int = 1) -> List[Dict[str, List[str]]]:
+        """
+        Extract entities from many texts, streaming them through nlp.pipe.
+        
+        Args:
+            texts: Input medical texts
+            batch_size: Texts per spaCy batch
+            n_process: Worker processes for nlp.pipe
+        
+        Returns:
+            One entity dictionary per text, in input order
+        """
+        docs = self.nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+        return [self._entities_from_doc(doc) for doc in docs]
+    
+    def _entities_from_doc(self, doc: Doc, text_lower: Optional[str] = None) -> Dict[str, List[str]]:
+        """Collect NER and dictionary entities from an already parsed doc (text_lower: doc.text.lower())."""
+        result = self._sorted_entities(self._entity_sets(doc, text_lower))
         
+        logger.info(f"Extracted {sum(len(v) for v in result.values())} entities from text")
+        return result
+    
+    @staticmethod
+    def _sorted_entities(entities: Dict[str, Set[str]]) -> Dict[str, List[str]]:
+        """Convert entity sets to sorted lists."""
+        return {key: sorted(list(value)) for key, value in entities.items()}
+    
+    def _entity_sets(self, doc: Doc | Span, text_lower: Optional[str] = None) -> Dict[str, Set[str]]:
+        """
+        NER and dictionary entities of a parsed doc or sentence, as sets per type.
+        
+        NER runs on the cased parse (ScispaCy is trained on cased text) and the
+        dictionaries on the lower-cased text; names are returned lower-cased.
+        """
         entities = {
             'procedures': set(),
             'anatomy': set(),
@@ -144,46 +282,32 @@ class MedicalEntityExtractor:
             'medications': set()
         }
         
-        # Extract using ScispaCy NER
+        # Extract using ScispaCy NER, mapping its labels to our categories
         for ent in doc.ents:
-            entity_text = ent.text.strip()
-            
-            # Map ScispaCy labels to our categories
-            if ent.label_ in ['PROCEDURE', 'TREATMENT']:
-                entities['procedures'].add(entity_text)
-            elif ent.label_ in ['ANATOMY', 'ORGAN', 'TISSUE']:
-                entities['anatomy'].add(entity_text)
-            elif ent.label_ in ['DEVICE', 'EQUIPMENT']:
-                entities['instruments'].add(entity_text)
-            elif ent.label_ in ['DISEASE', 'SYMPTOM', 'ADVERSE_EVENT']:
-                entities['complications'].add(entity_text)
-            elif ent.label_ in ['MEDICATION', 'DRUG', 'CHEMICAL']:
-                entities['medications'].add(entity_text)
-        
-        # Extract using custom phrase matcher
-        matches = self.matcher(doc)
-        for match_id, start, end in matches:
-            label = self.nlp.vocab.strings[match_id]
-            span_text = doc[start:end].text
-            
-            if label == 'PROCEDURE':
-                entities['procedures'].add(span_text)
-            elif label == 'ANATOMY':
-                entities['anatomy'].add(span_text)
-            elif label == 'INSTRUMENT':
-                entities['instruments'].add(span_text)
-            elif label == 'COMPLICATION':
-                entities['complications'].add(span_text)
-            elif label == 'TECHNIQUE':
-                entities['techniques'].add(span_text)
-            elif label == 'MEDICATION':
-                entities['medications'].add(span_text)
-        
-        # Convert sets to sorted lists
-        result = {key: sorted(list(value)) for key, value in entities.items()}
+            category = NER_LABEL_CATEGORIES.get(ent.label_)
+            if category is not None:
+                entities[category].add(ent.text.strip().lower())
         
-        logger.info(f"Extracted {sum(len(v) for v in result.values())} entities from text")
-        return result
+        # Extract using the custom dictionaries
+        for label, span_text in self._dictionary_matches(doc, text_lower):
+            entities[DICTIONARY_LABEL_CATEGORIES[label]].add(span_text)
+        
+        return entities
+    
+    def _dictionary_matches(self, doc: Doc | Span, text_lower: Optional[str] = None) -> Iterable[Tuple[str, str]]:
+        """(label, matched text) for every dictionary term found in a doc or sentence."""
+        if self.automaton is not None:
+            text = text_lower if text_lower is not None else doc.text.lower()
+            for end, (label, term) in self.automaton.iter(text):
+                start = end - len(term) + 1
+                # Only whole words, as the token-based PhraseMatcher would match
+                if _is_token_boundary(text, start, end + 1):
+                    yield label, term
+            return
+        
+        # On a sentence Span the matcher returns offsets into the parent Doc
+        for match_id, start, end in self.matcher(doc):
+            yield self._match_labels[match_id], doc.doc[start:end].text.lower()
     
     def extract_procedure_specific_entities(self, text: str, procedure: str) -> Dict[str, List[str]]:
         """
@@ -196,25 +320,102 @@ class MedicalEntityExtractor:
         Returns:
             Filtered entities related to the procedure
         """
-        # Extract all entities
-        all_entities = self.extract_entities(text)
+        doc = self.nlp(text)
         
-        # Filter entities that appear in context with the procedure
-        doc = self.nlp(text.lower())
-        procedure_doc = self.nlp(procedure.lower())
+        # Keep only entities from the sentences that mention the procedure
+        procedure_entities = self._procedure_entities(self._sentence_entities(doc), procedure)
+        if procedure_entities is not None:
+            return procedure_entities
         
-        # Find sentences containing the procedure
-        procedure_sentences = []
+        return self._entities_from_doc(doc)
+    
+    def _sentence_entities(self, doc: Doc) -> List[Tuple[str, Dict[str, Set[str]]]]:
+        """(lower-cased sentence text, entity sets) for every sentence of a parsed doc."""
+        sentence_entities = []
         for sent in doc.sents:
-            if procedure.lower() in sent.text.lower():
-                procedure_sentences.append(sent.text)
+            sent_lower = sent.text.lower()
+            sentence_entities.append((sent_lower, self._entity_sets(sent, sent_lower)))
+        return sentence_entities
+    
+    def _procedure_entities(self,
+                            sentence_entities: List[Tuple[str, Dict[str, Set[str]]]],
+                            procedure: str) -> Optional[Dict[str, List[str]]]:
+        """Union of the entities of sentences mentioning the procedure, or None if none do."""
+        procedure_lower = procedure.lower()
+        return self._merge_entities(
+            entities for sent_text, entities in sentence_entities if procedure_lower in sent_text
+        )
+    
+    def _merge_entities(self, entity_sets: Iterable[Dict[str, Set[str]]]) -> Optional[Dict[str, List[str]]]:
+        """Union of several entity-set dicts as sorted lists, or None if there are none."""
+        merged = None
+        for entities in entity_sets:
+            if merged is None:
+                merged = {key: set() for key in entities}
+            for key, values in entities.items():
+                merged[key] |= values
+        
+        return self._sorted_entities(merged) if merged is not None else None
+    
+    def _analyze_texts(self,
+                       texts: Iterable[str],
+                       batch_size: int = 32,
+                       n_process: int = 1) -> Tuple[List[Tuple[str, Dict[str, Set[str]]]], List[Dict[str, str]]]:
+        """
+        Parse a document in pieces (e.g. its chunks) through nlp.pipe.
         
-        # Re-extract entities from procedure-specific sentences
-        if procedure_sentences:
-            context_text = " ".join(procedure_sentences)
-            return self.extract_entities(context_text)
+        Keeps each parse short, so parser cost grows linearly with the document
+        instead of with its longest span, and no full-document Doc is held.
         
-        return all_entities
+        Returns:
+            (per-sentence entities as from _sentence_entities, relationships)
+        """
+        sentence_entities = []
+        relationships = []
+        for doc in self.nlp.pipe(texts, batch_size=batch_size, n_process=n_process):
+            sentence_entities.extend(self._sentence_entities(doc))
+            relationships.extend(self._relationships_from_doc(doc))
+        return sentence_entities, relationships
+    
+    def extract_graph_rows(self,
+                           chunks: Iterable[str],
+                           text: str,
+                           top_n: int = 5,
+                           batch_size: int = 32) -> Dict[str, Any]:
+        """
+        Everything needed to write one document to the knowledge graph, from a
+        single nlp.pipe pass over its chunks.
+        
+        Args:
+            chunks: The document's chunks, used as parsing units
+            text: Full document text (procedure frequencies are counted on it)
+            top_n: Number of main procedures to keep
+            batch_size: Chunks per spaCy batch
+        
+        Returns:
+            Dict with 'entities' (document-wide, empty if none were found),
+            'main_procedures' ((procedure, frequency) tuples), 'rows' (one
+            {'procedure': name, <entity type>: [...]} dict per main procedure)
+            and 'relationships'
+        """
+        sentence_entities, relationships = self._analyze_texts(chunks, batch_size=batch_size)
+        entities = self._merge_entities(ents for _, ents in sentence_entities) or {}
+        
+        main_procedures = []
+        rows = []
+        if any(entities.values()):
+            main_procedures = self._rank_procedures(entities, text.lower(), top_n=top_n)
+            # Each procedure takes the union of the entities of the sentences that mention it
+            for procedure_name, _ in main_procedures:
+                proc_entities = self._procedure_entities(sentence_entities, procedure_name) or entities
+                rows.append({'procedure': procedure_name, **proc_entities})
+        
+        return {
+            'entities': entities,
+            'main_procedures': main_procedures,
+            'rows': rows,
+            'relationships': relationships
+        }
     
     def identify_main_procedures(self, text: str, top_n: int = 3) -> List[Tuple[str, int]]:
         """
@@ -227,26 +428,53 @@ class MedicalEntityExtractor:
         Returns:
             List of (procedure, frequency) tuples
         """
-        entities = self.extract_entities(text)
-        procedures = entities['procedures']
-        
-        # Count occurrences
-        doc = self.nlp(text.lower())
-        procedure_counts = {}
-        
-        for proc in procedures:
-            count = text.lower().count(proc)
-            if count > 0:
-                procedure_counts[proc] = count
-        
-        # Sort by frequency
-        sorted_procedures = sorted(
-            procedure_counts.items(), 
-            key=lambda x: x[1], 
-            reverse=True
-        )
-        
-        return sorted_procedures[:top_n]
+        return self._main_procedures_from_doc(self.nlp(text), top_n=top_n, text_lower=text.lower())
+    
+    def _main_procedures_from_doc(self,
+                                  doc: Doc,
+                                  top_n: int = 3,
+                                  entities: Optional[Dict[str, List[str]]] = None,
+                                  text_lower: Optional[str] = None) -> List[Tuple[str, int]]:
+        """Rank procedures of a parsed doc; pass entities / doc.text.lower() if already computed."""
+        if text_lower is None:
+            text_lower = doc.text.lower()
+        if entities is None:
+            entities = self._entities_from_doc(doc, text_lower)
+        return self._rank_procedures(entities, text_lower, top_n)
+    
+    def _rank_procedures(self,
+                         entities: Dict[str, List[str]],
+                         text_lower: str,
+                         top_n: int = 3) -> List[Tuple[str, int]]:
+        """(procedure, frequency in text_lower) for the top_n most frequent extracted procedures."""
+        # Count occurrences, dropping procedures that never occur verbatim; most_common
+        # breaks frequency ties by the (alphabetical) order of entities['procedures']
+        counts = self._count_occurrences(entities['procedures'], text_lower)
+        return (+counts).most_common(top_n)
+    
+    @staticmethod
+    def _count_occurrences(terms: List[str], text_lower: str) -> Counter:
+        """Non-overlapping whole-word occurrence counts of each term (in terms order)."""
+        terms = [term for term in terms if term]
+        counts = Counter(dict.fromkeys(terms, 0))
+        remaining = terms
+        if HAS_AHOCORASICK and terms:
+            # Dictionary terms are counted in one pass of the shared automaton; a hit
+            # only counts if it is a whole word and starts after the term's last counted hit
+            automaton = _dictionary_automaton()
+            last_end = {}
+            for end, (_, term) in automaton.iter(text_lower):
+                if term not in counts:
+                    continue
+                start = end - len(term) + 1
+                if start >= last_end.get(term, 0) and _is_token_boundary(text_lower, start, end + 1):
+                    counts[term] += 1
+                    last_end[term] = end + 1
+            # NER-only procedures are not in the automaton
+            remaining = [term for term in terms if term not in automaton]
+        for term in remaining:
+            counts[term] = _count_whole_words(term, text_lower)
+        return counts
     
     def extract_relationships(self, text: str) -> List[Dict[str, str]]:
         """
@@ -258,34 +486,27 @@ class MedicalEntityExtractor:
         Returns:
             List of relationship dictionaries
         """
-        doc = self.nlp(text)
-        relationships = []
-        
-        # Extract entities first
-        entities = self.extract_entities(text)
-        
+        return self._relationships_from_doc(self.nlp(text))
+    
+    def _relationships_from_doc(self, doc: Doc) -> List[Dict[str, str]]:
+        """Subject-verb-object relationships from the dependency parse of a doc."""
         # Look for common relationship patterns
         # Example: "procedure requires instrument"
         # Example: "procedure may cause complication"
         
-        for sent in doc.sents:
-            # Find verbs that indicate relationships
-            for token in sent:
-                if token.pos_ == "VERB":
-                    # Get subject and object
-                    subjects = [child for child in token.children if child.dep_ in ['nsubj', 'nsubjpass']]
-                    objects = [child for child in token.children if child.dep_ in ['dobj', 'pobj']]
-                    
-                    for subj in subjects:
-                        for obj in objects:
-                            relationships.append({
-                                'subject': subj.text,
-                                'verb': token.text,
-                                'object': obj.text,
-                                'sentence': sent.text
-                            })
-        
-        return relationships
+        # Token ids come back as [verb, subject, object]; sorting restores document
+        # order (verbs in turn, then each verb's subjects and objects in child order)
+        triples = sorted(tuple(token_ids) for _, token_ids in self.dep_matcher(doc))
+        
+        return [
+            {
+                'subject': doc[s].text,
+                'verb': doc[v].text,
+                'object': doc[o].text,
+                'sentence': doc[v].sent.text
+            }
+            for v, s, o in triples
+        ]
     
     def get_entity_context(self, text: str, entity: str, window: int = 50) -> List[str]:
         """
@@ -299,22 +520,12 @@ class MedicalEntityExtractor:
         Returns:
             List of context snippets
         """
-        contexts = []
-        entity_lower = entity.lower()
         text_lower = text.lower()
-        
-        start = 0
-        while True:
-            pos = text_lower.find(entity_lower, start)
-            if pos == -1:
-                break
-            
-            # Extract context window
-            context_start = max(0, pos - window)
-            context_end = min(len(text), pos + len(entity) + window)
-            context = text[context_start:context_end]
-            
-            contexts.append(context.strip())
-            start = pos + 1
-        
-        return contexts
+        entity_len = len(entity)
+        
+        # The lookahead keeps overlapping mentions, like advancing one character past each hit
+        pattern = re.compile(f"(?={re.escape(entity.lower())})")
+        return [
+            text[max(0, m.start() - window):m.start() + entity_len + window].strip()
+            for m in pattern.finditer(text_lower)
+        ]
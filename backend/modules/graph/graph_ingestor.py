@@ -6,9 +6,10 @@ Processes PDFs to extract both:
 """
 
 from typing import List, Dict, Any, Optional
+from itertools import islice
 import logging
 from ..data_ingestion.pdf_parser import extract_text_from_pdf_bytes
-from ..data_ingestion.chunker import simple_chunk_text
+from ..data_ingestion.chunker import iter_chunk_text, simple_chunk_text
 from ..embedder.embedder import BioClinicalEmbedder
 from ..retriever.faiss_manager import FaissManager
 from ..graph.neo4j_manager import Neo4jManager
@@ -22,6 +23,9 @@ class GraphEnhancedIngestor:
     Enhanced document ingestion that builds both vector index and knowledge graph.
     """
     
+    # Chunks embedded and added to FAISS per step in ingest_pdf
+    STREAM_BATCH_SIZE = 32
+    
     def __init__(self,
                  embedder: BioClinicalEmbedder,
                  faiss_manager: FaissManager,
@@ -75,39 +79,41 @@ class GraphEnhancedIngestor:
             'error': None
         }
         
+        index_size = self.faiss.index.ntotal
         try:
             # Step 1: Extract text from PDF
-            logger.info(f"Extracting text from {filename}")
-            full_text = extract_text_from_pdf_bytes(pdf_bytes)
-            
-            if not full_text.strip():
-                raise ValueError("No text extracted from PDF")
+            full_text = self._extract_text(pdf_bytes, filename)
             
-            # Step 2: Chunk text for vector embeddings
-            logger.info("Chunking text")
-            chunks = simple_chunk_text(full_text)
-            stats['chunks_created'] = len(chunks)
+            # Steps 2-3: Stream chunks through the embedder into FAISS in micro-batches,
+            # so only one batch of embeddings is held at a time; the index is saved once
+            logger.info("Chunking and embedding text")
+            chunk_iter = iter_chunk_text(full_text)
+            chunk_texts = []
+            chunk_metadatas = []
+            while batch := list(islice(chunk_iter, self.STREAM_BATCH_SIZE)):
+                embeddings = self.embedder.embed_texts(batch, batch_size=self.STREAM_BATCH_SIZE)
+                batch_metadatas = [
+                    self._chunk_metadata(filename, len(chunk_metadatas) + i, chunk, metadata)
+                    for i, chunk in enumerate(batch)
+                ]
+                self.faiss.add(embeddings, batch_metadatas, persist=False)
+                chunk_texts.extend(batch)
+                chunk_metadatas.extend(batch_metadatas)
             
-            # Step 3: Create embeddings and add to FAISS
-            logger.info(f"Creating embeddings for {len(chunks)} chunks")
-            embeddings = self.embedder.embed_texts(chunks)
+            # total_chunks is only known once the stream is exhausted
+            if 'total_chunks' not in (metadata or {}):
+                for meta in chunk_metadatas:
+                    meta['total_chunks'] = len(chunk_metadatas)
+            if self.faiss.index_path:
+                self.faiss.save(self.faiss.index_path)
             
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                chunk_metadata = {
-                    'source': filename,
-                    'chunk_index': i,
-                    'total_chunks': len(chunks),
-                    'text': chunk,
-                    **(metadata or {})
-                }
-                self.faiss.add([embedding], [chunk_metadata])
-            
-            stats['embeddings_added'] = len(chunks)
+            stats['chunks_created'] = len(chunk_metadatas)
+            stats['embeddings_added'] = len(chunk_metadatas)
             
             # Step 4: Build knowledge graph (if enabled)
             if self.build_graph:
                 logger.info("Building knowledge graph from document")
-                graph_stats = self._build_graph_from_text(full_text, filename)
+                graph_stats = self._build_graph_from_text(full_text, filename, chunks=chunk_texts)
                 stats.update(graph_stats)
             
             stats['success'] = True
@@ -117,16 +123,44 @@ class GraphEnhancedIngestor:
         except Exception as e:
             logger.error(f"Failed to ingest {filename}: {e}")
             stats['error'] = str(e)
+            if not stats['embeddings_added']:
+                # Don't leave the batches of a half-ingested document in the index
+                self.faiss.truncate(index_size)
         
         return stats
     
-    def _build_graph_from_text(self, text: str, source: str) -> Dict[str, Any]:
+    def _extract_text(self, pdf_bytes: bytes, filename: str) -> str:
+        """Extract a PDF's text, failing if there is none."""
+        logger.info(f"Extracting text from {filename}")
+        full_text = extract_text_from_pdf_bytes(pdf_bytes)
+        
+        if not full_text.strip():
+            raise ValueError("No text extracted from PDF")
+        return full_text
+    
+    @staticmethod
+    def _chunk_metadata(filename: str,
+                        chunk_index: int,
+                        chunk: str,
+                        metadata: Dict[str, Any] = None,
+                        total_chunks: int = 0) -> Dict[str, Any]:
+        """FAISS metadata for one chunk of a document."""
+        return {
+            'source': filename,
+            'chunk_index': chunk_index,
+            'total_chunks': total_chunks,
+            'text': chunk,
+            **(metadata or {})
+        }
+    
+    def _build_graph_from_text(self, text: str, source: str, chunks: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Extract entities and build knowledge graph from text.
         
         Args:
             text: Full document text
             source: Document source/filename
+            chunks: The document's chunks, used as parsing units (chunked here if None)
         
         Returns:
             Graph building statistics
@@ -138,9 +172,14 @@ class GraphEnhancedIngestor:
         }
         
         try:
-            # Extract entities from the entire document
+            # Parse the document chunk by chunk through nlp.pipe (the same units that
+            # were embedded) rather than as one huge Doc; every step below reads this pass
             logger.info("Extracting medical entities")
-            entities = self.extractor.extract_entities(text)
+            if chunks is None:
+                chunks = simple_chunk_text(text)
+            extracted = self.extractor.extract_graph_rows(chunks, text, top_n=5)
+            entities = extracted['entities']
+            relationships = extracted['relationships']
             
             # Count total entities
             total_entities = sum(len(v) for v in entities.values())
@@ -151,24 +190,21 @@ class GraphEnhancedIngestor:
                 return stats
             
             # Identify main procedures in the document
-            main_procedures = self.extractor.identify_main_procedures(text, top_n=5)
+            main_procedures = extracted['main_procedures']
             
             logger.info(f"Found {len(main_procedures)} main procedures: {[p[0] for p in main_procedures]}")
             
-            # For each main procedure, build graph
-            for procedure_name, frequency in main_procedures:
-                # Extract procedure-specific entities
-                proc_entities = self.extractor.extract_procedure_specific_entities(text, procedure_name)
-                
-                # Add procedure and related entities to graph
-                self.graph.add_procedure_with_entities(procedure_name, proc_entities)
-                
+            # Add all procedures and related entities to the graph in one transaction
+            rows = extracted['rows']
+            self.graph.add_procedures_bulk(rows)
+            
+            for row in rows:
+                num_entities = sum(len(v) for key, v in row.items() if key != 'procedure')
                 # Count nodes (approximate - some may be duplicates)
-                stats['graph_nodes_created'] += 1 + sum(len(v) for v in proc_entities.values())
-                stats['graph_relationships_created'] += sum(len(v) for v in proc_entities.values())
+                stats['graph_nodes_created'] += 1 + num_entities
+                stats['graph_relationships_created'] += num_entities
             
-            # Extract and add relationships
-            relationships = self.extractor.extract_relationships(text)
+            # Relationships were extracted in the same pass
             logger.info(f"Extracted {len(relationships)} relationships from text")
             
         except Exception as e:
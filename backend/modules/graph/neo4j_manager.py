@@ -34,6 +34,15 @@ class Neo4jManager:
     - CONTRAINDICATED_WITH: Procedure -> Procedure
     """
     
+    # Entity type -> (relationship from the procedure, node label)
+    RELATIONSHIP_MAP = {
+        'anatomy': ('INVOLVES', 'Anatomy'),
+        'instruments': ('REQUIRES', 'Instrument'),
+        'complications': ('MAY_CAUSE', 'Complication'),
+        'techniques': ('USES_TECHNIQUE', 'Technique'),
+        'medications': ('REQUIRES_MEDICATION', 'Medication')
+    }
+    
     def __init__(self, uri: str, user: str, password: str):
         """
         Initialize Neo4j connection.
@@ -176,34 +185,69 @@ class Neo4jManager:
                          'medications': ['Antibiotics']
                      }
         """
-        # Create procedure node
-        self.create_procedure_node(procedure)
+        self.add_procedures_bulk([{'procedure': procedure, **entities}])
+        
+        logger.info(f"Added procedure '{procedure}' with {sum(len(v) for v in entities.values())} related entities")
+    
+    def add_procedures_bulk(self, rows: List[Dict[str, Any]]):
+        """
+        Add several procedures with their related entities in one write transaction.
+        
+        Each entity type is written by a single UNWIND query, so a document's graph
+        costs a handful of round-trips instead of two per entity.
+        
+        Args:
+            rows: One dict per procedure with a 'procedure' name plus entity lists
+                  keyed like add_procedure_with_entities (e.g. 'anatomy', 'instruments')
+        """
+        procedures = list(dict.fromkeys(row['procedure'] for row in rows))
+        if not procedures:
+            return
         
-        # Define relationship mappings
-        relationship_map = {
-            'anatomy': ('INVOLVES', 'Anatomy'),
-            'instruments': ('REQUIRES', 'Instrument'),
-            'complications': ('MAY_CAUSE', 'Complication'),
-            'techniques': ('USES_TECHNIQUE', 'Technique'),
-            'medications': ('REQUIRES_MEDICATION', 'Medication')
+        # Node labels and relationship types can't be query parameters, so there is
+        # one statement per entity type
+        pairs_by_type = {
+            entity_type: [
+                {'procedure': row['procedure'], 'name': name}
+                for row in rows
+                for name in row.get(entity_type, [])
+            ]
+            for entity_type in self.RELATIONSHIP_MAP
         }
         
-        # Create entities and relationships
-        for entity_type, entity_list in entities.items():
-            if entity_type in relationship_map:
-                rel_type, node_label = relationship_map[entity_type]
-                
-                for entity_name in entity_list:
-                    # Create entity node
-                    self.create_entity_node(node_label, entity_name)
-                    
-                    # Create relationship
-                    self.create_relationship(
-                        procedure, entity_name,
-                        rel_type, 'Procedure', node_label
-                    )
+        def _write(tx):
+            tx.run("""
+                UNWIND $procedures AS name
+                MERGE (p:Procedure {name: name})
+                ON CREATE SET 
+                    p.description = '',
+                    p.created_at = datetime()
+                ON MATCH SET
+                    p.updated_at = datetime()
+            """, procedures=procedures)
+            
+            for entity_type, pairs in pairs_by_type.items():
+                if not pairs:
+                    continue
+                rel_type, node_label = self.RELATIONSHIP_MAP[entity_type]
+                tx.run(f"""
+                    UNWIND $pairs AS pair
+                    MATCH (p:Procedure {{name: pair.procedure}})
+                    MERGE (e:{node_label} {{name: pair.name}})
+                    ON CREATE SET 
+                        e.created_at = datetime()
+                    ON MATCH SET
+                        e.updated_at = datetime()
+                    MERGE (p)-[r:{rel_type}]->(e)
+                    ON CREATE SET 
+                        r.created_at = datetime()
+                """, pairs=pairs)
         
-        logger.info(f"Added procedure '{procedure}' with {sum(len(v) for v in entities.values())} related entities")
+        with self.driver.session() as session:
+            session.execute_write(_write)
+        
+        logger.info(f"Bulk-added {len(procedures)} procedures with "
+                    f"{sum(len(pairs) for pairs in pairs_by_type.values())} entity relationships")
     
     def find_related_procedures(self, procedure: str, max_depth: int = 2) -> List[Dict[str, Any]]:
         """
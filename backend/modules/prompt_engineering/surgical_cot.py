@@ -9,6 +9,11 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def context_text(contexts: List[Dict[str, Any]]) -> str:
+    """Chunk texts of the retrieved contexts, blank-line separated (shared with the generator)"""
+    return "\n\n".join(c.get("metadata", {}).get("text", "") for c in contexts)
+
+
 class SurgicalCoTPrompter:
     """
     Creates Chain-of-Thought prompts specifically for surgical procedures.
@@ -49,10 +54,7 @@ class SurgicalCoTPrompter:
             Complete CoT prompt string
         """
         # Extract context text
-        context_texts = "\n\n".join([
-            c.get("metadata", {}).get("text", "") 
-            for c in contexts
-        ])
+        context_texts = context_text(contexts)
         
         # Build the CoT prompt
         prompt = f"""You are an expert surgical educator. You MUST follow this Chain-of-Thought reasoning process before answering.
@@ -123,10 +125,7 @@ Based on the reasoning above and the provided context, generate a clear, accurat
         Returns:
             CoT prompt focused on step ordering
         """
-        context_texts = "\n\n".join([
-            c.get("metadata", {}).get("text", "") 
-            for c in contexts
-        ])
+        context_texts = context_text(contexts)
         
         prompt = f"""You are explaining surgical procedure steps to a {level} learner.
 
@@ -181,10 +180,7 @@ YOUR ANSWER:
         Returns:
             CoT prompt focused on instruments
         """
-        context_texts = "\n\n".join([
-            c.get("metadata", {}).get("text", "") 
-            for c in contexts
-        ])
+        context_texts = context_text(contexts)
         
         prompt = f"""You are explaining surgical instruments to a {level} learner.
 
@@ -237,10 +233,7 @@ YOUR ANSWER:
         Returns:
             CoT prompt focused on complications
         """
-        context_texts = "\n\n".join([
-            c.get("metadata", {}).get("text", "") 
-            for c in contexts
-        ])
+        context_texts = context_text(contexts)
         
         prompt = f"""You are teaching complication management to a {level} learner.
 
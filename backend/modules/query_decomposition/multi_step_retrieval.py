@@ -31,6 +31,12 @@ class QueryDecomposer:
          "What are the key differences between pediatric and adult approaches?"]
     """
     
+    # Complexity indicator keywords (matched against the lowercased query)
+    QUESTION_WORDS = ('what', 'how', 'why', 'when', 'which', 'where')
+    CONJUNCTIONS = (' and ', ' or ', ' also ', ', and', ', or')
+    COMPARISONS = ('differ', 'compare', 'versus', 'vs', 'difference between', 'contrast')
+    ASPECTS = ('step', 'instrument', 'complication', 'indication', 'contraindication', 'technique')
+    
     def __init__(self, 
                  api_key: Optional[str] = None,
                  base_url: Optional[str] = None,
@@ -144,24 +150,22 @@ class QueryDecomposer:
         complexity_score = 0
         
         # Multiple question words
-        question_words = ['what', 'how', 'why', 'when', 'which', 'where']
-        question_count = sum(1 for word in question_words if query_lower.count(word) > 0)
+        question_count = sum(1 for word in self.QUESTION_WORDS if word in query_lower)
         if question_count > 1:
             complexity_score += 2
         
         # Conjunction indicators
-        conjunctions = [' and ', ' or ', ' also ', ', and', ', or']
-        if any(conj in query_lower for conj in conjunctions):
+        has_conjunctions = any(conj in query_lower for conj in self.CONJUNCTIONS)
+        if has_conjunctions:
             complexity_score += 2
         
         # Comparison indicators
-        comparisons = ['differ', 'compare', 'versus', 'vs', 'difference between', 'contrast']
-        if any(comp in query_lower for comp in comparisons):
+        is_comparison = any(comp in query_lower for comp in self.COMPARISONS)
+        if is_comparison:
             complexity_score += 3
         
         # Multi-aspect indicators
-        aspects = ['step', 'instrument', 'complication', 'indication', 'contraindication', 'technique']
-        aspect_count = sum(1 for aspect in aspects if aspect in query_lower)
+        aspect_count = sum(1 for aspect in self.ASPECTS if aspect in query_lower)
         if aspect_count >= 2:
             complexity_score += 2
         
@@ -177,8 +181,8 @@ class QueryDecomposer:
             'complexity_score': complexity_score,
             'indicators': {
                 'multiple_questions': question_count > 1,
-                'has_conjunctions': any(conj in query_lower for conj in conjunctions),
-                'is_comparison': any(comp in query_lower for comp in comparisons),
+                'has_conjunctions': has_conjunctions,
+                'is_comparison': is_comparison,
                 'multi_aspect': aspect_count >= 2,
                 'long_query': len(query) > 100
             }
@@ -0,0 +1,277 @@
+"""
+Approximate FAISS indexes for evaluation workloads
+Builds an HNSW graph, an IVF+PQ index or an 8-bit scalar-quantized index
+over the vectors of an existing flat index so that evaluators issuing many
+queries get sub-linear search or a 4x smaller index.
+"""
+import os
+import time
+import faiss
+import numpy as np
+
+
+HNSW_SUFFIX = ".hnsw"
+IVFPQ_SUFFIX = ".ivfpq"
+SQ8_SUFFIX = ".sq8"
+
+
+def hnsw_path_for(index_path: str) -> str:
+    """Path of the HNSW companion file for a flat index"""
+    return index_path + HNSW_SUFFIX
+
+
+def ivfpq_path_for(index_path: str) -> str:
+    """Path of the IVF+PQ companion file for a flat index"""
+    return index_path + IVFPQ_SUFFIX
+
+
+def sq8_path_for(index_path: str) -> str:
+    """Path of the int8 scalar-quantized companion file for a flat index"""
+    return index_path + SQ8_SUFFIX
+
+
+def build_approximate_index(
+    flat_index: faiss.Index,
+    M: int = 32,
+    ef_construction: int = 200,
+    ef_search: int = 64,
+    output_path: str | None = None
+) -> faiss.Index:
+    """
+    Build an IndexHNSWFlat from the vectors stored in a flat index
+
+    Vector ids are preserved (vectors are added in the same order), so the
+    existing FaissManager metadata keeps working unchanged.
+
+    Args:
+        flat_index: Source IndexFlatIP (normalized vectors)
+        M: Graph neighbours per node
+        ef_construction: Build-time candidate list size
+        ef_search: Query-time candidate list size
+        output_path: Optional path to persist the HNSW index
+
+    Returns:
+        The populated HNSW index
+    """
+    vectors = flat_index.reconstruct_n(0, flat_index.ntotal)
+
+    hnsw = faiss.IndexHNSWFlat(flat_index.d, M, faiss.METRIC_INNER_PRODUCT)
+    hnsw.hnsw.efConstruction = ef_construction
+    hnsw.hnsw.efSearch = ef_search
+    hnsw.add(np.ascontiguousarray(vectors, dtype="float32"))
+
+    if output_path:
+        faiss.write_index(hnsw, output_path)
+    return hnsw
+
+
+def build_ivfpq_index(
+    flat_index: faiss.Index,
+    nlist: int | None = None,
+    pq_m: int = 64,
+    nprobe: int = 8,
+    output_path: str | None = None
+) -> faiss.Index:
+    """
+    Build and train an IVF+PQ index (via index_factory) from a flat index
+
+    Compresses each 768-d float32 vector to pq_m bytes and only scans
+    nprobe of the nlist inverted lists per query.
+
+    Args:
+        flat_index: Source IndexFlatIP (normalized vectors)
+        nlist: Number of coarse clusters (default ~4*sqrt(ntotal), capped at 4096)
+        pq_m: Number of PQ sub-quantizers (must divide the dimension)
+        nprobe: Inverted lists scanned per query
+        output_path: Optional path to persist the index
+
+    Returns:
+        The trained and populated IVF+PQ index
+    """
+    ntotal = flat_index.ntotal
+    if ntotal < 256:
+        raise ValueError(f"IVF+PQ needs at least 256 training vectors, index has {ntotal}")
+    if nlist is None:
+        nlist = min(4096, max(1, int(4 * np.sqrt(ntotal))))
+
+    vectors = np.ascontiguousarray(flat_index.reconstruct_n(0, ntotal), dtype="float32")
+
+    index = faiss.index_factory(flat_index.d, f"IVF{nlist},PQ{pq_m}", faiss.METRIC_INNER_PRODUCT)
+    index.train(vectors)
+    index.add(vectors)
+    # keep reconstruct(i) working for callers that read vectors back by id
+    faiss.extract_index_ivf(index).make_direct_map()
+    set_search_params(index, nprobe=nprobe)
+
+    if output_path:
+        faiss.write_index(index, output_path)
+    return index
+
+
+def build_sq8_index(flat_index: faiss.Index, output_path: str | None = None) -> faiss.Index:
+    """
+    Build an IndexScalarQuantizer storing each dimension as one byte
+
+    Exhaustive like the flat index (same ids, no query-time knob) but reads a
+    quarter of the bytes per scanned vector; per-dimension ranges are learned
+    from the indexed vectors.
+
+    Args:
+        flat_index: Source IndexFlatIP (normalized vectors)
+        output_path: Optional path to persist the index
+
+    Returns:
+        The trained and populated SQ8 index
+    """
+    vectors = np.ascontiguousarray(flat_index.reconstruct_n(0, flat_index.ntotal), dtype="float32")
+
+    index = faiss.IndexScalarQuantizer(flat_index.d, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+    index.train(vectors)
+    index.add(vectors)
+
+    if output_path:
+        faiss.write_index(index, output_path)
+    return index
+
+
+def set_search_params(index: faiss.Index, nprobe: int | None = None, ef_search: int | None = None):
+    """Apply query-time knobs (IVF nprobe / HNSW efSearch) where the index supports them"""
+    if nprobe is not None:
+        try:
+            faiss.extract_index_ivf(index).nprobe = nprobe
+        except RuntimeError:
+            pass  # not an IVF index
+    if ef_search is not None and hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search
+
+
+def load_approximate_index(index_path: str, nprobe: int | None = None, ef_search: int | None = None):
+    """Load the HNSW, IVF+PQ or SQ8 companion of a flat index if one has been built, else None"""
+    for path in (hnsw_path_for(index_path), ivfpq_path_for(index_path), sq8_path_for(index_path)):
+        if os.path.exists(path):
+            index = faiss.read_index(path)
+            set_search_params(index, nprobe=nprobe, ef_search=ef_search)
+            return index
+    return None
+
+
+def _sample_queries(flat_index: faiss.Index, sample_size: int, seed: int) -> np.ndarray:
+    """A random sample of indexed vectors to use as queries"""
+    rng = np.random.default_rng(seed)
+    ids = rng.choice(flat_index.ntotal, size=min(sample_size, flat_index.ntotal), replace=False)
+    return np.vstack([flat_index.reconstruct(int(i)) for i in ids]).astype("float32")
+
+
+def _recall(exact: np.ndarray, approx: np.ndarray) -> float:
+    hits = sum(len(set(e[e >= 0]) & set(a[a >= 0])) for e, a in zip(exact, approx))
+    total = int((exact >= 0).sum())
+    return hits / total if total else 0.0
+
+
+def recall_vs_flat(
+    flat_index: faiss.Index,
+    approx_index: faiss.Index,
+    sample_size: int = 100,
+    top_k: int = 10,
+    seed: int = 42
+) -> float:
+    """
+    Recall@k of the approximate index against exact flat search
+
+    Uses a random sample of indexed vectors as queries.
+    """
+    if flat_index.ntotal == 0:
+        return 0.0
+
+    queries = _sample_queries(flat_index, sample_size, seed)
+    _, exact = flat_index.search(queries, top_k)
+    _, approx = approx_index.search(queries, top_k)
+    return _recall(exact, approx)
+
+
+def tune_search_params(
+    flat_index: faiss.Index,
+    approx_index: faiss.Index,
+    target_recall: float = 0.95,
+    top_k: int = 10,
+    sample_size: int = 100,
+    seed: int = 42
+) -> dict | None:
+    """
+    Pick the cheapest nprobe (IVF) or efSearch (HNSW) that reaches a target recall
+
+    Sweeps the query-time knob, measuring recall@k against exact flat search and
+    batch latency on sampled indexed vectors, then sets the smallest value that
+    meets target_recall (or the most accurate one if none does).
+
+    Returns:
+        Dict with the tuned parameter, chosen value, its recall and the full sweep,
+        or None if the index has no query-time knob
+    """
+    try:
+        nlist = faiss.extract_index_ivf(approx_index).nlist
+        param = "nprobe"
+        candidates = [v for v in (1, 4, 8, 16, 32, 64) if v <= nlist]
+    except RuntimeError:
+        if not hasattr(approx_index, "hnsw"):
+            return None
+        param = "efSearch"
+        candidates = [v for v in (16, 32, 64, 128, 256) if v >= top_k]
+
+    if flat_index.ntotal == 0 or not candidates:
+        return None
+
+    queries = _sample_queries(flat_index, sample_size, seed)
+    _, exact = flat_index.search(queries, top_k)
+
+    sweep = []
+    for value in candidates:
+        set_search_params(approx_index, **{"nprobe" if param == "nprobe" else "ef_search": value})
+        start = time.perf_counter()
+        _, approx = approx_index.search(queries, top_k)
+        latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        sweep.append({"value": value, "recall": _recall(exact, approx), "latency_ms": latency_ms})
+
+    chosen = next((row for row in sweep if row["recall"] >= target_recall), None)
+    if chosen is None:
+        chosen = max(sweep, key=lambda row: row["recall"])
+    set_search_params(approx_index, **{"nprobe" if param == "nprobe" else "ef_search": chosen["value"]})
+
+    return {"param": param, "value": chosen["value"], "recall": chosen["recall"], "sweep": sweep}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build an approximate companion index for a flat FAISS index")
+    parser.add_argument("index_path", nargs="?", default="faiss_index.index")
+    parser.add_argument("--type", choices=["hnsw", "ivfpq", "sq8"], default="hnsw")
+    parser.add_argument("--ef-search", type=int, default=64, help="HNSW query-time candidate list size")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF coarse clusters")
+    parser.add_argument("--pq-m", type=int, default=64, help="PQ sub-quantizers")
+    parser.add_argument("--nprobe", type=int, default=8, help="IVF lists scanned per query")
+    parser.add_argument("--tune", action="store_true", help="Sweep nprobe/efSearch and report the recall/latency trade-off")
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    args = parser.parse_args()
+
+    flat = faiss.read_index(args.index_path)
+    if args.type == "hnsw":
+        output_path = hnsw_path_for(args.index_path)
+        approx = build_approximate_index(flat, ef_search=args.ef_search, output_path=output_path)
+    elif args.type == "ivfpq":
+        output_path = ivfpq_path_for(args.index_path)
+        approx = build_ivfpq_index(flat, nlist=args.nlist, pq_m=args.pq_m, nprobe=args.nprobe, output_path=output_path)
+    else:
+        output_path = sq8_path_for(args.index_path)
+        approx = build_sq8_index(flat, output_path=output_path)
+    print(f"Built {args.type} index over {approx.ntotal} vectors: {output_path}")
+    print(f"Recall@10 vs flat: {recall_vs_flat(flat, approx):.4f}")
+
+    if args.tune:
+        tuned = tune_search_params(flat, approx, target_recall=args.target_recall)
+        if tuned:
+            for row in tuned["sweep"]:
+                print(f"  {tuned['param']}={row['value']:<4} recall@10={row['recall']:.4f}  {row['latency_ms']:.3f} ms/query")
+            # nprobe / efSearch are serialized with the index, so the tuned value becomes the default
+            faiss.write_index(approx, output_path)
+            print(f"Chosen {tuned['param']}={tuned['value']}, saved to {output_path}")
@@ -12,19 +12,32 @@ class FaissManager:
         self.id_to_meta: Dict[int, Dict[str, Any]] = {}
         self.next_id = 0
 
-    def add(self, embeddings: List[List[float]], metadatas: List[Dict[str, Any]]):
-        arr = np.array(embeddings, dtype="float32")
-        # normalize rows
-        norms = np.linalg.norm(arr, axis=1, keepdims=True)
-        norms[norms == 0] = 1
-        arr = arr / norms
+    def add(self, embeddings: List[List[float]], metadatas: List[Dict[str, Any]], persist: bool = True):
+        """Append a (n, dim) batch of vectors and their metadata in one index call.
+
+        With persist=False the index is not written to index_path; callers adding
+        several batches in a row save once at the end instead of after every batch.
+        """
+        arr = np.array(embeddings, dtype="float32").reshape(-1, self.dim)
+        # normalize rows once at build time so inner product == cosine (zero rows are left as-is)
+        faiss.normalize_L2(arr)
         self.index.add(arr)
-        for meta in metadatas:
-            self.id_to_meta[self.next_id] = meta
-            self.next_id += 1
-        if self.index_path:
+        self.id_to_meta.update(zip(range(self.next_id, self.next_id + len(metadatas)), metadatas))
+        self.next_id += len(metadatas)
+        if persist and self.index_path:
             self.save(self.index_path)
 
+    def truncate(self, size: int):
+        """Drop every vector (and its metadata) with id >= size, e.g. to undo a partial ingest.
+
+        Only the tail is removed, so the ids of the remaining vectors are unchanged.
+        """
+        if size < self.index.ntotal:
+            self.index.remove_ids(np.arange(size, self.index.ntotal, dtype="int64"))
+        for idx in [i for i in self.id_to_meta if i >= size]:
+            del self.id_to_meta[idx]
+        self.next_id = min(self.next_id, size)
+
     def save(self, path: str):
         faiss.write_index(self.index, path)
         # save metadata next to it
@@ -40,12 +53,44 @@ class FaissManager:
                 self.next_id = max(self.id_to_meta.keys()) + 1
 
     def query(self, query_embedding: List[float], top_k: int = 5):
-        arr = np.array(query_embedding, dtype="float32").reshape(1, -1)
-        # normalize
-        arr = arr / np.linalg.norm(arr, axis=1, keepdims=True)
-        D, I = self.index.search(arr, top_k)
-        results = []
-        for score, idx in zip(D[0], I[0]):
-            meta = self.id_to_meta.get(int(idx), {})
-            results.append({"score": float(score), "metadata": meta})
-        return results
+        return self.query_batch([query_embedding], top_k=top_k)[0]
+
+    def query_batch(self, query_embeddings, top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Search a (n, dim) batch of queries with one FAISS call; returns one result list per query."""
+        D, I = self.search(query_embeddings, top_k)
+        return self.to_results(D, I)
+
+    def search(self, query_embeddings, top_k: int = 5, copy: bool = True):
+        """Normalize a (n, dim) batch of queries and run a single index search; returns (scores, ids).
+
+        With copy=False a C-contiguous float32 array is normalized in place and
+        handed to FAISS as-is.
+        """
+        if copy:
+            # copy into a C-contiguous float32 matrix so normalize_L2 never touches the caller's data
+            arr = np.array(query_embeddings, dtype="float32").reshape(-1, self.dim)
+        else:
+            arr = np.ascontiguousarray(query_embeddings, dtype="float32")
+        faiss.normalize_L2(arr)
+        return self.index.search(arr, top_k)
+
+    def metadata_list(self) -> List[Dict[str, Any]]:
+        """Metadata as a plain list indexed by FAISS id ({} for ids without metadata).
+
+        Lets batch callers resolve a whole (n, k) id matrix by list indexing
+        instead of building a result dict per hit.
+        """
+        return [self.id_to_meta.get(i, {}) for i in range(self.index.ntotal)]
+
+    def to_results(self, D, I) -> List[List[Dict[str, Any]]]:
+        """Convert raw search output into per-query lists of {score, metadata} dicts."""
+        batch_results = []
+        for scores, ids in zip(D, I):
+            # FAISS returns distinct ids per row and pads with -1 when top_k > ntotal
+            valid = ids >= 0
+            results = []
+            for score, idx in zip(scores[valid].tolist(), ids[valid].tolist()):
+                meta = self.id_to_meta.get(idx, {})
+                results.append({"score": score, "metadata": meta})
+            batch_results.append(results)
+        return batch_results
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Backend code imports its packages as top-level modules (modules.*, app.*)
+sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from modules.data_ingestion import chunker
+from modules.data_ingestion.chunker import iter_chunk_text, simple_chunk_text
+
+
+def _reference_chunks(text, approx_tokens):
+    # The original list-based chunker: chunk boundaries decide the FAISS ids
+    words = text.split()
+    return [" ".join(words[i:i + approx_tokens]) for i in range(0, len(words), approx_tokens)]
+
+
+WHITESPACE = [" ", "  ", "\t", "\n", "\r\n", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x1f", " ", " ", "　"]
+WORDS = ["appendix", "laparoscopic", "a", "résection", "naïve", "胆囊", "x-ray", "1.5cm", "​zero"]
+
+
+def _random_text(rng, num_words, words=WORDS, whitespace=WHITESPACE):
+    parts = [rng.choice(whitespace)]
+    for _ in range(num_words):
+        parts.append(rng.choice(words))
+        parts.append(rng.choice(whitespace))
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("approx_tokens", [1, 3, 400])
+def test_matches_reference_on_mixed_whitespace(approx_tokens):
+    rng = random.Random(approx_tokens)
+    for num_words in [0, 1, 2, 3, 7, 50, 1200]:
+        text = _random_text(rng, num_words)
+        assert simple_chunk_text(text, approx_tokens) == _reference_chunks(text, approx_tokens)
+
+
+def test_whitespace_only():
+    assert simple_chunk_text(" \t\n\x1c ") == []
+
+
+@pytest.mark.parametrize("ascii_only", [True, False], ids=["ascii", "non_ascii"])
+def test_matches_reference_on_large_texts(ascii_only):
+    rng = random.Random(0)
+    if ascii_only:
+        words = [w for w in WORDS if w.isascii()]
+        whitespace = [w for w in WHITESPACE if w.isascii()]
+    else:
+        words, whitespace = WORDS, WHITESPACE
+    text = _random_text(rng, 200_000, words, whitespace)
+    assert len(text) >= chunker._NUMBA_MIN_CHARS
+    assert text.isascii() == ascii_only
+    
+    for approx_tokens in (7, 400):
+        assert list(iter_chunk_text(text, approx_tokens)) == _reference_chunks(text, approx_tokens)
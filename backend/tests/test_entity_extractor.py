@@ -0,0 +1,51 @@
+import pytest
+
+spacy = pytest.importorskip("spacy")
+
+from modules.graph import entity_extractor
+from modules.graph.entity_extractor import MedicalEntityExtractor
+
+
+def _blank_pipeline(model_name):
+    # Dictionary matching only needs tokens and sentence boundaries
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    return nlp
+
+
+@pytest.fixture(params=[False, True], ids=["phrase_matcher", "automaton"])
+def extractor(request, monkeypatch):
+    if request.param and not entity_extractor.HAS_AHOCORASICK:
+        pytest.skip("pyahocorasick not installed")
+    monkeypatch.setattr(entity_extractor, "HAS_AHOCORASICK", request.param)
+    monkeypatch.setattr(entity_extractor.spacy, "load", _blank_pipeline)
+    return MedicalEntityExtractor()
+
+
+def test_sentence_matches_after_the_first_sentence(extractor):
+    text = "The patient was stable. An appendectomy was performed with a trocar. Sepsis followed."
+    entities = extractor.extract_procedure_specific_entities(text, "appendectomy")
+    assert entities["procedures"] == ["appendectomy"]
+    assert entities["instruments"] == ["trocar"]
+    assert entities["complications"] == []
+    
+    sentences = extractor._sentence_entities(extractor.nlp(text))
+    assert [sent_text for sent_text, _ in sentences][2] == "sepsis followed."
+    assert sentences[2][1]["complications"] == {"sepsis"}
+
+
+def test_multiword_terms_match_single_spaced_only(extractor):
+    # Both matching paths work on tokens: spaCy turns extra whitespace into tokens
+    # of its own, so a term split by a newline or a double space is not matched
+    text = "A cesarean  section, then hernia\nrepair. Finally a hernia repair."
+    entities = extractor.extract_entities(text)
+    assert entities["procedures"] == ["hernia repair"]
+    assert entities["complications"] == ["hernia"]
+
+
+def test_main_procedures_count_whole_words_and_break_ties_alphabetically(extractor):
+    text = ("Colectomy and appendectomy. Appendectomy again. Gastrectomy, colectomy. "
+            "A laparotomy, then a relaparotomy and laparotomy-related pain.")
+    assert extractor.identify_main_procedures(text, top_n=4) == [
+        ("appendectomy", 2), ("colectomy", 2), ("laparotomy", 2), ("gastrectomy", 1)
+    ]
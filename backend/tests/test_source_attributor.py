@@ -0,0 +1,18 @@
+from modules.attribution.source_attributor import SourceAttributor
+
+
+def test_verify_citations_ignores_unprepared_contexts():
+    attributor = SourceAttributor()
+    prepared = attributor.prepare_contexts_with_source_ids(
+        [{'metadata': {'source': 'wses_guidelines.pdf', 'id': 3, 'text': 'Appendectomy is preferred.'}}]
+    )
+    source_id = prepared[0]['source_id']
+    contexts = prepared + [{'metadata': {'text': 'Retrieved without a source id'}}]
+    
+    result = attributor.verify_citations(f"Appendectomy is preferred [{source_id}] [FAKE-9].", contexts)
+    
+    assert result['valid_citations'] == [source_id]
+    assert result['invalid_citations'] == ['FAKE-9']
+    assert result['uncited_sources'] == []
+    assert result['valid_sources_available'] == 1
+    assert result['hallucination_detected']